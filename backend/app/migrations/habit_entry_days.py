@@ -0,0 +1,48 @@
+"""One-off migration: normalize habit entries to one row per (habit_id, day).
+
+Older databases stored ``habit_entries`` without a ``day`` column and the
+habit routers compared the ``DateTime`` column against a ``date``, so repeat
+logging inserted duplicate rows. This backfills ``day``, keeps the most
+recent entry for every habit-day, adds the unique index the upsert relies
+on and compacts the file.
+
+Run from the backend directory::
+
+    python -m app.migrations.habit_entry_days
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from ..models.database import engine as default_engine
+
+INDEX_NAME = "uq_habit_entries_habit_day"
+
+def upgrade(engine: Engine) -> int:
+    """Apply the migration and return the number of duplicate rows removed."""
+    columns = {col["name"] for col in inspect(engine).get_columns("habit_entries")}
+
+    with engine.begin() as conn:
+        if "day" not in columns:
+            conn.execute(text("ALTER TABLE habit_entries ADD COLUMN day DATE"))
+        conn.execute(text("UPDATE habit_entries SET day = date(date) WHERE day IS NULL"))
+
+        # Keep the latest write for each habit-day, drop the rest
+        removed = conn.execute(text("""
+            DELETE FROM habit_entries
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM habit_entries GROUP BY habit_id, day
+            )
+        """)).rowcount
+
+        conn.execute(text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME} ON habit_entries (habit_id, day)"
+        ))
+
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+
+    return removed
+
+if __name__ == "__main__":
+    removed = upgrade(default_engine)
+    print(f"Removed {removed} duplicate habit entries")
@@ -0,0 +1,23 @@
+"""One-off migration: build habit_years heatmap rows from existing entries.
+
+New databases get the table from ``create_all`` and fill it as entries are
+written; this backfills it for entries logged before it existed.
+
+Run from the backend directory::
+
+    python -m app.migrations.habit_heatmaps
+"""
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from ..models.database import engine as default_engine
+from ..models.models import HabitYear
+from ..services.heatmaps import rebuild_habit_years
+
+def upgrade(engine: Engine):
+    HabitYear.__table__.create(engine, checkfirst=True)
+    with Session(engine) as db:
+        rebuild_habit_years(db)
+
+if __name__ == "__main__":
+    upgrade(default_engine)
+    print("Built habit heatmap years")
@@ -0,0 +1,70 @@
+"""One-off migration: integer-coded task priorities and habit/roadmap categories.
+
+``tasks.priority`` moves from a free-form string to the integer codes in
+``PRIORITY_CODES`` (unknown values become 'medium'), and the repeated
+category strings on ``habits`` and ``roadmaps`` move into the shared
+``categories`` lookup table referenced by ``category_id``.
+
+Run from the backend directory::
+
+    python -m app.migrations.integer_enums
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from ..models.database import Base, engine as default_engine
+from ..models.models import Category, Task, TaskPriority, PRIORITY_CODES
+
+def _rebuild_tasks(conn: Connection, columns: list):
+    """Recreate ``tasks`` with the integer priority column and copy rows across.
+
+    SQLite cannot change a column's type in place, so the old table is renamed,
+    its indexes dropped (their names are reused), and the rows re-inserted.
+    """
+    old_indexes = conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks' AND sql IS NOT NULL"
+    )).scalars().all()
+    for name in old_indexes:
+        conn.execute(text(f"DROP INDEX {name}"))
+    conn.execute(text("ALTER TABLE tasks RENAME TO tasks_old"))
+    Task.__table__.create(conn)
+
+    cases = " ".join(f"WHEN '{name}' THEN {code}" for name, code in PRIORITY_CODES.items())
+    priority = f"CASE lower(priority) {cases} ELSE {PRIORITY_CODES['medium']} END"
+    select = ", ".join(priority if col == "priority" else col for col in columns)
+    conn.execute(text(f"INSERT INTO tasks ({', '.join(columns)}) SELECT {select} FROM tasks_old"))
+    conn.execute(text("DROP TABLE tasks_old"))
+
+def _move_categories(conn: Connection, table: str):
+    """Point ``table.category_id`` at ``categories`` and drop the string column."""
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN category_id INTEGER REFERENCES categories (id)"))
+    conn.execute(text(
+        f"INSERT OR IGNORE INTO categories (name) SELECT DISTINCT category FROM {table} WHERE category IS NOT NULL"
+    ))
+    conn.execute(text(
+        f"UPDATE {table} SET category_id = (SELECT id FROM categories WHERE categories.name = {table}.category)"
+    ))
+    conn.execute(text(f"ALTER TABLE {table} DROP COLUMN category"))
+
+def upgrade(engine: Engine):
+    inspector = inspect(engine)
+    task_columns = {col["name"]: col for col in inspector.get_columns("tasks")}
+    habit_columns = {col["name"] for col in inspector.get_columns("habits")}
+    roadmap_columns = {col["name"] for col in inspector.get_columns("roadmaps")}
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn, tables=[TaskPriority.__table__, Category.__table__])
+
+        if "INT" not in str(task_columns["priority"]["type"]).upper():
+            _rebuild_tasks(conn, list(task_columns))
+
+        if "category_id" not in habit_columns:
+            _move_categories(conn, "habits")
+        if "category_id" not in roadmap_columns:
+            _move_categories(conn, "roadmaps")
+
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_habits_owner_category ON habits (owner_id, category_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_roadmaps_category_id ON roadmaps (category_id)"))
+
+if __name__ == "__main__":
+    upgrade(default_engine)
+    print("Converted priorities and categories to integer codes")
@@ -0,0 +1,46 @@
+"""One-off migration: columns for adopting predefined roadmaps.
+
+Adds ``roadmaps.duration_days`` (filled in for the seeded predefined
+roadmaps) and ``roadmaps.source_roadmap_id``, indexes
+``milestones.roadmap_id`` for copying a template's milestones, and makes
+``(owner_id, source_roadmap_id)`` unique so a roadmap is adopted at most
+once per user. If concurrent adopt requests already left a user with two
+copies, creating that index fails until the surplus copy is deleted.
+
+Predefined milestones could previously be marked complete by any user;
+that flag was shared by everyone, so it is reset here.
+
+Run from the backend directory::
+
+    python -m app.migrations.roadmap_adoption
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from ..models.database import engine as default_engine
+from ..routers.roadmaps import PREDEFINED_ROADMAPS
+
+def upgrade(engine: Engine):
+    columns = {col["name"] for col in inspect(engine).get_columns("roadmaps")}
+
+    with engine.begin() as conn:
+        if "duration_days" not in columns:
+            conn.execute(text("ALTER TABLE roadmaps ADD COLUMN duration_days INTEGER"))
+        if "source_roadmap_id" not in columns:
+            conn.execute(text("ALTER TABLE roadmaps ADD COLUMN source_roadmap_id INTEGER REFERENCES roadmaps (id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_milestones_roadmap_id ON milestones (roadmap_id)"))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_roadmaps_owner_source ON roadmaps (owner_id, source_roadmap_id)"
+        ))
+
+        for roadmap in PREDEFINED_ROADMAPS:
+            conn.execute(
+                text("UPDATE roadmaps SET duration_days = :days WHERE is_predefined AND title = :title AND duration_days IS NULL"),
+                {"days": roadmap["duration_days"], "title": roadmap["title"]},
+            )
+        conn.execute(text(
+            "UPDATE milestones SET is_completed = 0 WHERE roadmap_id IN (SELECT id FROM roadmaps WHERE is_predefined)"
+        ))
+
+if __name__ == "__main__":
+    upgrade(default_engine)
+    print("Added roadmap adoption columns")
@@ -0,0 +1,43 @@
+"""One-off migration: add per-user change sequence numbers for delta sync.
+
+Adds ``users.change_seq`` and a ``version`` column to tasks, habits,
+roadmaps and habit_entries, plus the ``tombstones`` table. Existing rows
+get version 1 and their owners change_seq 1, so a client's first sync
+(``since=0``) returns everything.
+
+Run from the backend directory::
+
+    python -m app.migrations.sync_versions
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from ..models.database import engine as default_engine
+from ..models.models import Tombstone
+
+VERSIONED_TABLES = ("tasks", "habits", "roadmaps", "habit_entries")
+
+def upgrade(engine: Engine):
+    inspector = inspect(engine)
+    user_columns = {col["name"] for col in inspector.get_columns("users")}
+    table_columns = {table: {col["name"] for col in inspector.get_columns(table)} for table in VERSIONED_TABLES}
+
+    with engine.begin() as conn:
+        if "change_seq" not in user_columns:
+            conn.execute(text("ALTER TABLE users ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(text("UPDATE users SET change_seq = 1 WHERE change_seq = 0"))
+
+        # The app always stamps versions >= 1, so 0 only marks pre-sync rows
+        for table in VERSIONED_TABLES:
+            if "version" not in table_columns[table]:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+            conn.execute(text(f"UPDATE {table} SET version = 1 WHERE version = 0"))
+
+        Tombstone.__table__.create(conn, checkfirst=True)
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_owner_version ON tasks (owner_id, version)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_habits_owner_version ON habits (owner_id, version)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_roadmaps_owner_version ON roadmaps (owner_id, version)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_habit_entries_habit_version ON habit_entries (habit_id, version)"))
+
+if __name__ == "__main__":
+    upgrade(default_engine)
+    print("Added sync versions")
@@ -1,7 +1,48 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, Text, Boolean, Float, ForeignKey, Index, LargeBinary, event, insert
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
-from .database import Base
+from sqlalchemy.types import TypeDecorator
+from .database import ArchiveBase, Base
 from datetime import datetime
+import uuid
+
+# Integer codes for task priorities; higher code means more urgent so that
+# ORDER BY priority DESC sorts by urgency.
+PRIORITY_CODES = {"low": 1, "medium": 2, "high": 3}
+PRIORITY_NAMES = {code: name for name, code in PRIORITY_CODES.items()}
+
+class PriorityType(TypeDecorator):
+    """Stores a priority name ('low'/'medium'/'high') as its integer code."""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        return PRIORITY_CODES[value]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return PRIORITY_NAMES[value]
+
+class TaskPriority(Base):
+    """Lookup table for PRIORITY_CODES, seeded when the table is created."""
+    __tablename__ = "task_priorities"
+    
+    code = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+@event.listens_for(TaskPriority.__table__, "after_create")
+def seed_task_priorities(target, connection, **kw):
+    connection.execute(insert(target), [{"code": code, "name": name} for name, code in PRIORITY_CODES.items()])
+
+class Category(Base):
+    """Shared lookup table for habit and roadmap category names."""
+    __tablename__ = "categories"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
 
 class User(Base):
     __tablename__ = "users"
@@ -12,6 +53,7 @@ class User(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    change_seq = Column(Integer, nullable=False, server_default="0")  # last sync version handed out
     
     roadmaps = relationship("Roadmap", back_populates="owner")
     tasks = relationship("Task", back_populates="owner")
@@ -19,18 +61,28 @@ class User(Base):
 
 class Roadmap(Base):
     __tablename__ = "roadmaps"
+    __table_args__ = (
+        Index("ix_roadmaps_owner_version", "owner_id", "version"),
+        # A predefined roadmap is adopted at most once per user
+        Index("uq_roadmaps_owner_source", "owner_id", "source_roadmap_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(Text)
-    category = Column(String)  # AI/MLOps, Data Science, etc.
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)  # AI/MLOps, Data Science, etc.
     is_predefined = Column(Boolean, default=False)
+    duration_days = Column(Integer, nullable=True)
+    source_roadmap_id = Column(Integer, ForeignKey("roadmaps.id"), nullable=True)  # predefined template it was adopted from
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, nullable=False, server_default="0")  # owner's change_seq at last write
     
     owner = relationship("User", back_populates="roadmaps")
     milestones = relationship("Milestone", back_populates="roadmap")
+    category_ref = relationship("Category", lazy="joined")
+    category = association_proxy("category_ref", "name")
 
 class Milestone(Base):
     __tablename__ = "milestones"
@@ -40,7 +92,7 @@ class Milestone(Base):
     description = Column(Text)
     day = Column(Integer)  # Day in the roadmap
     is_completed = Column(Boolean, default=False)
-    roadmap_id = Column(Integer, ForeignKey("roadmaps.id"))
+    roadmap_id = Column(Integer, ForeignKey("roadmaps.id"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     roadmap = relationship("Roadmap", back_populates="milestones")
@@ -48,51 +100,162 @@ class Milestone(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_owner_priority", "owner_id", "priority"),
+        Index("ix_tasks_owner_version", "owner_id", "version"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     description = Column(Text)
     due_date = Column(DateTime)
     is_completed = Column(Boolean, default=False)
-    priority = Column(String, default="medium")  # low, medium, high
+    priority = Column(PriorityType, ForeignKey("task_priorities.code"), default="medium")  # low, medium, high
     estimated_hours = Column(Float)
     actual_hours = Column(Float)
     owner_id = Column(Integer, ForeignKey("users.id"))
     milestone_id = Column(Integer, ForeignKey("milestones.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, server_default="0")  # owner's change_seq at last write
     
     owner = relationship("User", back_populates="tasks")
     milestone = relationship("Milestone", back_populates="tasks")
 
 class Habit(Base):
     __tablename__ = "habits"
+    __table_args__ = (
+        Index("ix_habits_owner_category", "owner_id", "category_id"),
+        Index("ix_habits_owner_version", "owner_id", "version"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     description = Column(Text)
-    category = Column(String)  # reading, exercise, sleep, etc.
+    category_id = Column(Integer, ForeignKey("categories.id"))  # reading, exercise, sleep, etc.
     target_frequency = Column(Integer)  # times per week
     is_active = Column(Boolean, default=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, nullable=False, server_default="0")  # owner's change_seq at last write
     
     owner = relationship("User", back_populates="habits")
     entries = relationship("HabitEntry", back_populates="habit")
+    category_ref = relationship("Category", lazy="joined")
+    category = association_proxy("category_ref", "name")
 
 class HabitEntry(Base):
     __tablename__ = "habit_entries"
+    __table_args__ = (
+        # One entry per habit per calendar day; target of the upsert in habits.py
+        Index("uq_habit_entries_habit_day", "habit_id", "day", unique=True),
+        Index("ix_habit_entries_habit_version", "habit_id", "version"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime)
+    day = Column(Date, nullable=False)  # date.date(), normalized day key
     completed = Column(Boolean)
     notes = Column(Text)
     rating = Column(Integer)  # 1-10 scale
     habit_id = Column(Integer, ForeignKey("habits.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, nullable=False, server_default="0")  # habit owner's change_seq at last write
     
     habit = relationship("Habit", back_populates="entries")
 
+class HabitYear(Base):
+    """Packed per-day completion and rating of one habit over one calendar year.
+
+    Day ``n`` of the year (0-based) is bit ``n % 8`` of byte ``n // 8`` in
+    ``logged`` and ``completed``, and nibble ``n % 2`` (low first) of byte
+    ``n // 2`` in ``ratings`` (0 means no rating). Kept in step with
+    habit_entries by services/heatmaps.py.
+    """
+    __tablename__ = "habit_years"
+    __table_args__ = (
+        Index("uq_habit_years_habit_year", "habit_id", "year", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    habit_id = Column(Integer, ForeignKey("habits.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    logged = Column(LargeBinary, nullable=False)  # 46 bytes
+    completed = Column(LargeBinary, nullable=False)  # 46 bytes
+    ratings = Column(LargeBinary, nullable=False)  # 183 bytes
+
+class TaskSummary(Base):
+    """Monthly totals, per priority, of a user's completed tasks that were moved to the archive."""
+    __tablename__ = "task_summaries"
+    __table_args__ = (
+        Index("uq_task_summaries_owner_month_priority", "owner_id", "month", "priority", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(Date, nullable=False)  # first day of the month the tasks were completed in
+    priority = Column(PriorityType, nullable=False)
+    tasks = Column(Integer, nullable=False, default=0)
+    estimated_hours = Column(Float, nullable=False, default=0)
+    actual_hours = Column(Float, nullable=False, default=0)
+
+class HabitEntryChunk(ArchiveBase):
+    """One habit's archived entries for one month, as zlib-compressed JSON columns."""
+    __tablename__ = "habit_entry_chunks"
+    __table_args__ = (
+        Index("uq_habit_entry_chunks_habit_month", "habit_id", "month", unique=True),
+        {"schema": "archive"},
+    )
+    
+    id = Column(Integer, primary_key=True)
+    habit_id = Column(Integer, nullable=False)  # no foreign key across databases
+    month = Column(Date, nullable=False)
+    rows = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+
+class TaskChunk(ArchiveBase):
+    """One user's archived tasks completed in one month, as zlib-compressed JSON columns."""
+    __tablename__ = "task_chunks"
+    __table_args__ = (
+        Index("uq_task_chunks_owner_month", "owner_id", "month", unique=True),
+        {"schema": "archive"},
+    )
+    
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, nullable=False)
+    month = Column(Date, nullable=False)
+    rows = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+
+class Tombstone(Base):
+    """Record of a hard-deleted row, so delta sync can report the deletion."""
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_owner_version", "owner_id", "version"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String, nullable=False)  # table name, e.g. "tasks"
+    entity_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+class SyncEpoch(Base):
+    """Single row naming this database's version history for delta sync.
+
+    Seeded when the table is created and replaced when a backup is restored,
+    since versions handed out after the snapshot are then reused.
+    """
+    __tablename__ = "sync_epoch"
+    
+    id = Column(Integer, primary_key=True)
+    epoch = Column(String, nullable=False)
+
+@event.listens_for(SyncEpoch.__table__, "after_create")
+def seed_sync_epoch(target, connection, **kw):
+    connection.execute(insert(target), [{"id": 1, "epoch": uuid.uuid4().hex}])
+
 class MLExperiment(Base):
     __tablename__ = "ml_experiments"
     
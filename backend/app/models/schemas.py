@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 # User schemas
 class UserBase(BaseModel):
@@ -23,6 +23,7 @@ class RoadmapBase(BaseModel):
     title: str
     description: Optional[str] = None
     category: str
+    duration_days: Optional[int] = None
 
 class RoadmapCreate(RoadmapBase):
     pass
@@ -30,6 +31,7 @@ class RoadmapCreate(RoadmapBase):
 class Roadmap(RoadmapBase):
     id: int
     is_predefined: bool
+    source_roadmap_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     
@@ -59,7 +61,7 @@ class TaskBase(BaseModel):
     title: str
     description: Optional[str] = None
     due_date: Optional[datetime] = None
-    priority: str = "medium"
+    priority: Literal["low", "medium", "high"] = "medium"
     estimated_hours: Optional[float] = None
 
 class TaskCreate(TaskBase):
@@ -110,6 +112,21 @@ class HabitEntry(HabitEntryBase):
     class Config:
         from_attributes = True
 
+# Sync schemas
+class Deletion(BaseModel):
+    entity: str
+    id: int
+    version: int
+
+class SyncChanges(BaseModel):
+    epoch: str
+    version: int
+    tasks: List[Task]
+    habits: List[Habit]
+    roadmaps: List[Roadmap]
+    habit_entries: List[HabitEntry]
+    deleted: List[Deletion]
+
 # Authentication schemas
 class Token(BaseModel):
     access_token: str
@@ -2,20 +2,47 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List
-from datetime import datetime, timedelta
-from ..models.database import get_db
-from ..models.models import Task, Habit, HabitEntry, User
+from datetime import date, datetime, time, timedelta
+from ..models.database import ReadSessionLocal, get_db
+from ..models.models import Task, TaskSummary, Habit, HabitEntry, User, PRIORITY_CODES
+from ..services import estimation, habit_insights
+from ..utils.cache import HABITS, TASKS, result_cache
 from .auth import get_current_user
 
 router = APIRouter()
 
+def get_read_db(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Session on the read replica when configured and caught up with the user's writes, else the primary
+
+    Every write bumps the user's ``change_seq`` (see services/sync.py), so a
+    replica whose copy of it is behind the primary's may be missing some of
+    them; those requests, and any result they would cache, use the primary.
+    """
+    if ReadSessionLocal is None:
+        yield db
+        return
+    read_db = ReadSessionLocal()
+    try:
+        replica_seq = read_db.query(User.change_seq).filter(User.id == current_user.id).scalar()
+        if replica_seq is None or replica_seq < current_user.change_seq:
+            read_db.close()
+            yield db
+        else:
+            yield read_db
+    finally:
+        read_db.close()
+
 @router.get("/overview")
-def get_analytics_overview(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_analytics_overview(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
     """Get analytics overview for dashboard"""
     
     # Task completion stats
     total_tasks = db.query(Task).filter(Task.owner_id == current_user.id).count()
     completed_tasks = db.query(Task).filter(Task.owner_id == current_user.id, Task.is_completed == True).count()
+    # Completed tasks moved to the archive still count
+    archived_tasks = db.query(func.coalesce(func.sum(TaskSummary.tasks), 0)).filter(TaskSummary.owner_id == current_user.id).scalar()
+    total_tasks += archived_tasks
+    completed_tasks += archived_tasks
     
     # This week's tasks
     week_start = datetime.now() - timedelta(days=7)
@@ -57,15 +84,17 @@ def get_analytics_overview(current_user: User = Depends(get_current_user), db: S
     }
 
 @router.get("/productivity")
-def get_productivity_analytics(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_productivity_analytics(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
     """Get productivity analytics - time spent per category"""
-    
+    return result_cache.get_or_compute(current_user.id, TASKS, "productivity", lambda: _productivity(db, current_user.id))
+
+def _productivity(db: Session, user_id: int) -> dict:
     # Time spent analysis
     time_by_priority = db.query(
         Task.priority,
         func.sum(Task.actual_hours).label('total_hours')
     ).filter(
-        Task.owner_id == current_user.id,
+        Task.owner_id == user_id,
         Task.actual_hours.isnot(None)
     ).group_by(Task.priority).all()
     
@@ -76,7 +105,7 @@ def get_productivity_analytics(current_user: User = Depends(get_current_user), d
         week_end = datetime.now() - timedelta(weeks=i)
         
         completed = db.query(Task).filter(
-            Task.owner_id == current_user.id,
+            Task.owner_id == user_id,
             Task.completed_at >= week_start,
             Task.completed_at < week_end,
             Task.is_completed == True
@@ -87,18 +116,36 @@ def get_productivity_analytics(current_user: User = Depends(get_current_user), d
             "completed_tasks": completed
         })
     
+    hours_by_priority = {item.priority: float(item.total_hours or 0) for item in time_by_priority}
+    archived_hours = db.query(TaskSummary.priority, func.sum(TaskSummary.actual_hours)).filter(
+        TaskSummary.owner_id == user_id
+    ).group_by(TaskSummary.priority).all()
+    for priority, hours in archived_hours:
+        if hours:
+            hours_by_priority[priority] = hours_by_priority.get(priority, 0) + hours
+    
     return {
-        "time_by_priority": [{"priority": item.priority, "hours": float(item.total_hours or 0)} for item in time_by_priority],
+        "time_by_priority": [
+            {"priority": priority, "hours": hours}
+            for priority, hours in sorted(hours_by_priority.items(), key=lambda item: PRIORITY_CODES.get(item[0], 0))
+        ],
         "weekly_trend": list(reversed(weekly_data))
     }
 
+@router.get("/estimation")
+def get_estimation_analytics(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    """Get estimate-vs-actual accuracy and forecast completion dates for open tasks and milestones"""
+    return estimation.get_estimation(db, current_user.id)
+
 @router.get("/habits")
-def get_habit_analytics(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_habit_analytics(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
     """Get habit tracking analytics"""
-    
+    return result_cache.get_or_compute(current_user.id, HABITS, "habits", lambda: _habit_analytics(db, current_user.id))
+
+def _habit_analytics(db: Session, user_id: int) -> dict:
     # Habit completion rates
     habits_data = []
-    user_habits = db.query(Habit).filter(Habit.owner_id == current_user.id, Habit.is_active == True).all()
+    user_habits = db.query(Habit).filter(Habit.owner_id == user_id, Habit.is_active == True).all()
     
     for habit in user_habits:
         # Last 30 days
@@ -128,10 +175,17 @@ def get_habit_analytics(current_user: User = Depends(get_current_user), db: Sess
     
     return {"habits": habits_data}
 
+@router.get("/habits/insights")
+def get_habit_insights(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    """Get habit correlations, rating trends, weekday effects and consistency scores"""
+    return habit_insights.get_insights(db, current_user.id)
+
 @router.get("/streaks")
-def get_streaks(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_streaks(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
     """Calculate current streaks for habits and tasks"""
-    
+    return result_cache.get_or_compute(current_user.id, TASKS, f"streaks:{date.today()}", lambda: _streaks(db, current_user.id))
+
+def _streaks(db: Session, user_id: int) -> dict:
     streaks = []
     
     # Task completion streak
@@ -139,9 +193,12 @@ def get_streaks(current_user: User = Depends(get_current_user), db: Session = De
     current_date = datetime.now().date()
     
     while True:
+        # A due_date range rather than a date function, which differs per database
+        day_start = datetime.combine(current_date, time.min)
         day_tasks = db.query(Task).filter(
-            Task.owner_id == current_user.id,
-            func.date(Task.due_date) == current_date,
+            Task.owner_id == user_id,
+            Task.due_date >= day_start,
+            Task.due_date < day_start + timedelta(days=1),
             Task.is_completed == True
         ).count()
         
@@ -5,6 +5,11 @@ from datetime import datetime, date
 from ..models.database import get_db
 from ..models.models import Habit, HabitEntry, User
 from ..models.schemas import Habit as HabitSchema, HabitCreate, HabitEntry as HabitEntrySchema, HabitEntryCreate
+from ..services.categories import with_category_id
+from ..services import archive, heatmaps
+from ..services.group_commit import run_write
+from ..services.habit_entries import upsert_habit_entry
+from ..utils.cache import HABITS, result_cache
 from .auth import get_current_user
 
 router = APIRouter()
@@ -18,10 +23,11 @@ def get_habits(current_user: User = Depends(get_current_user), db: Session = Dep
 @router.post("/", response_model=HabitSchema)
 def create_habit(habit: HabitCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new habit"""
-    db_habit = Habit(**habit.dict(), owner_id=current_user.id)
+    db_habit = Habit(**with_category_id(db, habit.dict()), owner_id=current_user.id)
     db.add(db_habit)
     db.commit()
     db.refresh(db_habit)
+    result_cache.invalidate(current_user.id, HABITS)
     return db_habit
 
 @router.get("/{habit_id}", response_model=HabitSchema)
@@ -32,18 +38,19 @@ def get_habit(habit_id: int, current_user: User = Depends(get_current_user), db:
         raise HTTPException(status_code=404, detail="Habit not found")
     return habit
 
-@router.put("/{habit_id}")
+@router.put("/{habit_id}", response_model=HabitSchema)
 def update_habit(habit_id: int, habit_update: HabitCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Update a habit"""
     habit = db.query(Habit).filter(Habit.id == habit_id, Habit.owner_id == current_user.id).first()
     if not habit:
         raise HTTPException(status_code=404, detail="Habit not found")
     
-    for key, value in habit_update.dict(exclude_unset=True).items():
+    for key, value in with_category_id(db, habit_update.dict(exclude_unset=True)).items():
         setattr(habit, key, value)
     
     db.commit()
     db.refresh(habit)
+    result_cache.invalidate(current_user.id, HABITS)
     return habit
 
 @router.delete("/{habit_id}")
@@ -55,6 +62,7 @@ def delete_habit(habit_id: int, current_user: User = Depends(get_current_user),
     
     habit.is_active = False
     db.commit()
+    result_cache.invalidate(current_user.id, HABITS)
     return {"message": "Habit deleted successfully"}
 
 @router.get("/{habit_id}/entries", response_model=List[HabitEntrySchema])
@@ -65,36 +73,29 @@ def get_habit_entries(habit_id: int, current_user: User = Depends(get_current_us
         raise HTTPException(status_code=404, detail="Habit not found")
     
     entries = db.query(HabitEntry).filter(HabitEntry.habit_id == habit_id).order_by(HabitEntry.date.desc()).all()
+    archived = archive.archived_habit_entries(db, habit_id)
+    if archived:
+        # A day logged again after it was archived is served from the hot row
+        hot_days = {entry.day for entry in entries}
+        entries += [entry for entry in archived if entry.day not in hot_days]
+        entries.sort(key=lambda entry: entry.date, reverse=True)
     return entries
 
 @router.post("/{habit_id}/entries", response_model=HabitEntrySchema)
 def create_habit_entry(habit_id: int, entry: HabitEntryCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new habit entry"""
-    habit = db.query(Habit).filter(Habit.id == habit_id, Habit.owner_id == current_user.id).first()
-    if not habit:
-        raise HTTPException(status_code=404, detail="Habit not found")
+    user_id = current_user.id
+    values = entry.dict(exclude_unset=True, exclude={"habit_id"})
     
-    # Check if entry for this date already exists
-    existing_entry = db.query(HabitEntry).filter(
-        HabitEntry.habit_id == habit_id,
-        HabitEntry.date == entry.date.date()
-    ).first()
+    def write(session: Session):
+        habit = session.query(Habit).filter(Habit.id == habit_id, Habit.owner_id == user_id).first()
+        if not habit:
+            raise HTTPException(status_code=404, detail="Habit not found")
+        return upsert_habit_entry(session, user_id, habit_id, values)
     
-    if existing_entry:
-        # Update existing entry
-        for key, value in entry.dict(exclude_unset=True).items():
-            if key != 'habit_id':  # Don't update habit_id
-                setattr(existing_entry, key, value)
-        db.commit()
-        db.refresh(existing_entry)
-        return existing_entry
-    else:
-        # Create new entry
-        db_entry = HabitEntry(**entry.dict())
-        db.add(db_entry)
-        db.commit()
-        db.refresh(db_entry)
-        return db_entry
+    entry, _ = run_write(db, write)
+    result_cache.invalidate(user_id, HABITS)
+    return entry
 
 @router.get("/today/")
 def get_today_habits(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -106,11 +107,11 @@ def get_today_habits(current_user: User = Depends(get_current_user), db: Session
     for habit in habits:
         entry = db.query(HabitEntry).filter(
             HabitEntry.habit_id == habit.id,
-            HabitEntry.date == today
+            HabitEntry.day == today
         ).first()
         
         habit_status.append({
-            "habit": habit,
+            "habit": HabitSchema.model_validate(habit),
             "completed": entry.completed if entry else False,
             "notes": entry.notes if entry else "",
             "rating": entry.rating if entry else None
@@ -118,36 +119,29 @@ def get_today_habits(current_user: User = Depends(get_current_user), db: Session
     
     return habit_status
 
+@router.get("/heatmap/")
+def get_habit_heatmap(year: int = None, include_ratings: bool = False, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Get a packed year-at-a-glance completion heatmap for all active habits"""
+    if year is not None and not date.min.year <= year <= date.max.year:
+        raise HTTPException(status_code=400, detail=f"year must be between {date.min.year} and {date.max.year}")
+    
+    return heatmaps.get_year_heatmap(db, current_user.id, date.today().year if year is None else year, include_ratings)
+
 @router.post("/quick-log")
 def quick_log_habit(habit_id: int, completed: bool, rating: int = None, notes: str = "", current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Quick log a habit for today"""
-    habit = db.query(Habit).filter(Habit.id == habit_id, Habit.owner_id == current_user.id).first()
-    if not habit:
-        raise HTTPException(status_code=404, detail="Habit not found")
+    user_id = current_user.id
+    values = {"date": datetime.now(), "completed": completed, "rating": rating, "notes": notes}
     
-    today = datetime.now()
-    entry_data = HabitEntryCreate(
-        date=today,
-        completed=completed,
-        rating=rating,
-        notes=notes,
-        habit_id=habit_id
-    )
+    def write(session: Session):
+        habit = session.query(Habit).filter(Habit.id == habit_id, Habit.owner_id == user_id).first()
+        if not habit:
+            raise HTTPException(status_code=404, detail="Habit not found")
+        return upsert_habit_entry(session, user_id, habit_id, values)
     
-    # Check if entry already exists for today
-    existing_entry = db.query(HabitEntry).filter(
-        HabitEntry.habit_id == habit_id,
-        HabitEntry.date == today.date()
-    ).first()
+    _, created = run_write(db, write)
+    result_cache.invalidate(user_id, HABITS)
     
-    if existing_entry:
-        existing_entry.completed = completed
-        existing_entry.rating = rating
-        existing_entry.notes = notes
-        db.commit()
-        return {"message": "Habit updated for today"}
-    else:
-        db_entry = HabitEntry(**entry_data.dict())
-        db.add(db_entry)
-        db.commit()
-        return {"message": "Habit logged for today"}
\ No newline at end of file
+    if created:
+        return {"message": "Habit logged for today"}
+    return {"message": "Habit updated for today"}
\ No newline at end of file
@@ -1,9 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
+from datetime import date
 from ..models.database import get_db
 from ..models.models import Roadmap, Milestone, User
 from ..models.schemas import Roadmap as RoadmapSchema, RoadmapCreate, Milestone as MilestoneSchema, MilestoneCreate
+from ..services.categories import get_category_id, with_category_id
+from ..services import scheduler
+from ..services.group_commit import run_write
+from ..services.roadmap_adoption import adopt_roadmap
+from ..utils.cache import TASKS, result_cache
 from .auth import get_current_user
 
 router = APIRouter()
@@ -14,6 +21,7 @@ PREDEFINED_ROADMAPS = [
         "title": "Become a Data Engineer in 100 Days",
         "description": "Complete roadmap to become a professional data engineer",
         "category": "Data Engineering",
+        "duration_days": 100,
         "milestones": [
             {"title": "Introduction to Data Engineering", "description": "Learn the basics of data engineering", "day": 1},
             {"title": "SQL Fundamentals", "description": "Master SQL querying and database design", "day": 5},
@@ -29,6 +37,7 @@ PREDEFINED_ROADMAPS = [
         "title": "MLOps Mastery in 90 Days",
         "description": "Comprehensive MLOps learning path",
         "category": "MLOps",
+        "duration_days": 90,
         "milestones": [
             {"title": "Introduction to MLOps", "description": "Understanding MLOps principles", "day": 1},
             {"title": "Git + DVC basics", "description": "Version control for ML projects", "day": 7},
@@ -51,7 +60,7 @@ def get_roadmaps(current_user: User = Depends(get_current_user), db: Session = D
 @router.post("/", response_model=RoadmapSchema)
 def create_roadmap(roadmap: RoadmapCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new custom roadmap"""
-    db_roadmap = Roadmap(**roadmap.dict(), owner_id=current_user.id)
+    db_roadmap = Roadmap(**with_category_id(db, roadmap.dict()), owner_id=current_user.id)
     db.add(db_roadmap)
     db.commit()
     db.refresh(db_roadmap)
@@ -72,7 +81,8 @@ def seed_predefined_roadmaps(db: Session = Depends(get_db)):
             db_roadmap = Roadmap(
                 title=roadmap_data["title"],
                 description=roadmap_data["description"],
-                category=roadmap_data["category"],
+                category_id=get_category_id(db, roadmap_data["category"]),
+                duration_days=roadmap_data["duration_days"],
                 is_predefined=True,
                 owner_id=None
             )
@@ -104,6 +114,37 @@ def get_roadmap(roadmap_id: int, current_user: User = Depends(get_current_user),
     
     return roadmap
 
+@router.post("/{roadmap_id}/adopt", response_model=RoadmapSchema)
+def adopt_predefined_roadmap(roadmap_id: int, start_date: date = None, hours_per_day: float = 1.0, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Copy a predefined roadmap, its milestones and daily tasks into the user's own plan"""
+    template = db.query(Roadmap).filter(Roadmap.id == roadmap_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Roadmap not found")
+    
+    if not template.is_predefined:
+        raise HTTPException(status_code=400, detail="Only predefined roadmaps can be adopted")
+    
+    if not 0 < hours_per_day <= 24:
+        raise HTTPException(status_code=400, detail="hours_per_day must be more than 0 and at most 24")
+    
+    existing = db.query(Roadmap).filter(
+        Roadmap.owner_id == current_user.id,
+        Roadmap.source_roadmap_id == roadmap_id
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Roadmap already adopted")
+    
+    # A concurrent adopt can pass the check above; the unique index catches it
+    try:
+        new_roadmap_id = adopt_roadmap(db, current_user.id, template, start_date or date.today(), hours_per_day)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Roadmap already adopted")
+    scheduler.invalidate(current_user.id)
+    result_cache.invalidate(current_user.id, TASKS)
+    return db.query(Roadmap).filter(Roadmap.id == new_roadmap_id).first()
+
 @router.get("/{roadmap_id}/milestones", response_model=List[MilestoneSchema])
 def get_roadmap_milestones(roadmap_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get all milestones for a roadmap"""
@@ -137,14 +178,21 @@ def create_milestone(roadmap_id: int, milestone: MilestoneCreate, current_user:
 @router.put("/milestones/{milestone_id}/complete")
 def complete_milestone(milestone_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Mark a milestone as completed"""
-    milestone = db.query(Milestone).filter(Milestone.id == milestone_id).first()
-    if not milestone:
-        raise HTTPException(status_code=404, detail="Milestone not found")
+    user_id = current_user.id
     
-    roadmap = db.query(Roadmap).filter(Roadmap.id == milestone.roadmap_id).first()
-    if roadmap.owner_id != current_user.id and not roadmap.is_predefined:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this milestone")
+    def write(session: Session):
+        milestone = session.query(Milestone).filter(Milestone.id == milestone_id).first()
+        if not milestone:
+            raise HTTPException(status_code=404, detail="Milestone not found")
+        
+        roadmap = session.query(Roadmap).filter(Roadmap.id == milestone.roadmap_id).first()
+        if roadmap.is_predefined:
+            raise HTTPException(status_code=403, detail="Adopt this roadmap to track progress on its milestones")
+        if roadmap.owner_id != user_id:
+            raise HTTPException(status_code=403, detail="Not authorized to modify this milestone")
+        
+        milestone.is_completed = True
+        session.flush()
     
-    milestone.is_completed = True
-    db.commit()
+    run_write(db, write)
     return {"message": "Milestone completed successfully"}
\ No newline at end of file
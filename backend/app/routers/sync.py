@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+from ..models.database import get_db
+from ..models.models import Habit, HabitEntry, Roadmap, Task, Tombstone, User
+from ..models.schemas import SyncChanges
+from ..services import archive
+from ..services import sync as change_tracking  # also registers the version-stamping flush hook
+from .auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/", response_model=SyncChanges)
+def get_changes(since: int = 0, epoch: Optional[str] = None, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Get rows created, updated or deleted since the client's last sync version.
+    
+    Versions are only meaningful within the ``epoch`` they were handed out in.
+    When the client's epoch is not the database's (a backup was restored
+    since), the response is a full snapshot under the new epoch and the
+    client should replace its local copy rather than merge into it.
+    
+    Archived tasks and habit entries (see services/archive.py) are included
+    only in full snapshots (``since=0``); incremental syncs cover the hot
+    rows. A client last synced before rows were archived, i.e. longer ago
+    than the archive horizon, should sync from 0 again.
+    """
+    if since < 0:
+        raise HTTPException(status_code=400, detail="since must not be negative")
+    
+    current_epoch = change_tracking.database_epoch(db)
+    if epoch is not None and epoch != current_epoch:
+        since = 0
+    
+    # Everything up to this version is committed; newer writes arrive next sync
+    version = current_user.change_seq
+    if since >= version:
+        return {"epoch": current_epoch, "version": version, "tasks": [], "habits": [], "roadmaps": [], "habit_entries": [], "deleted": []}
+    
+    tasks = db.query(Task).filter(
+        Task.owner_id == current_user.id,
+        Task.version > since,
+        Task.version <= version
+    ).all()
+    
+    habits = db.query(Habit).filter(
+        Habit.owner_id == current_user.id,
+        Habit.version > since,
+        Habit.version <= version
+    ).all()
+    
+    roadmaps = db.query(Roadmap).filter(
+        Roadmap.owner_id == current_user.id,
+        Roadmap.version > since,
+        Roadmap.version <= version
+    ).all()
+    
+    habit_entries = db.query(HabitEntry).join(Habit).filter(
+        Habit.owner_id == current_user.id,
+        HabitEntry.version > since,
+        HabitEntry.version <= version
+    ).all()
+    
+    if since == 0:
+        # Archival deletes the hot rows without tombstones; a row in both
+        # tiers, left by an interrupted archive run, is served from the hot one
+        hot_ids = {task.id for task in tasks}
+        tasks += [task for task in archive.archived_tasks(db, current_user.id)
+                  if task.id not in hot_ids and since < task.version <= version]
+        habit_ids = [habit_id for (habit_id,) in db.query(Habit.id).filter(Habit.owner_id == current_user.id)]
+        hot_days = {(entry.habit_id, entry.day) for entry in habit_entries}
+        habit_entries += [entry for entry in archive.archived_entries(db, habit_ids)
+                          if (entry.habit_id, entry.day) not in hot_days and since < entry.version <= version]
+    
+    tombstones = db.query(Tombstone).filter(
+        Tombstone.owner_id == current_user.id,
+        Tombstone.version > since,
+        Tombstone.version <= version
+    ).all()
+    
+    # Habits are soft-deleted, so an inactive habit is reported as a deletion
+    deleted = [{"entity": t.entity, "id": t.entity_id, "version": t.version} for t in tombstones]
+    deleted += [{"entity": "habits", "id": h.id, "version": h.version} for h in habits if not h.is_active]
+    
+    return {
+        "epoch": current_epoch,
+        "version": version,
+        "tasks": tasks,
+        "habits": [h for h in habits if h.is_active],
+        "roadmaps": roadmaps,
+        "habit_entries": habit_entries,
+        "deleted": deleted
+    }
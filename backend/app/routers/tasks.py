@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 from ..models.database import get_db
 from ..models.models import Task, User
 from ..models.schemas import Task as TaskSchema, TaskCreate
+from ..services import archive, scheduler
+from ..services.group_commit import run_write
+from ..utils.cache import TASKS, result_cache
 from .auth import get_current_user
 
 router = APIRouter()
@@ -13,15 +16,29 @@ router = APIRouter()
 def get_tasks(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get all tasks for the current user"""
     tasks = db.query(Task).filter(Task.owner_id == current_user.id).order_by(Task.due_date).all()
+    archived = archive.archived_tasks(db, current_user.id)
+    if archived:
+        hot_ids = {task.id for task in tasks}
+        tasks += [task for task in archived if task.id not in hot_ids]
+        tasks.sort(key=lambda task: (task.due_date is not None, task.due_date or datetime.min))
     return tasks
 
 @router.post("/", response_model=TaskSchema)
 def create_task(task: TaskCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new task"""
-    db_task = Task(**task.dict(), owner_id=current_user.id)
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    values = dict(task.dict(), owner_id=current_user.id)
+    
+    def write(session: Session):
+        db_task = Task(**values)
+        session.add(db_task)
+        session.flush()
+        # Re-read, as the direct path's commit would, so values come back as stored
+        session.refresh(db_task)
+        return db_task
+    
+    db_task = run_write(db, write)
+    scheduler.task_changed(db_task)
+    result_cache.invalidate(current_user.id, TASKS)
     return db_task
 
 @router.get("/{task_id}", response_model=TaskSchema)
@@ -35,16 +52,23 @@ def get_task(task_id: int, current_user: User = Depends(get_current_user), db: S
 @router.put("/{task_id}/complete")
 def complete_task(task_id: int, actual_hours: float = None, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Mark a task as completed"""
-    task = db.query(Task).filter(Task.id == task_id, Task.owner_id == current_user.id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    user_id = current_user.id
     
-    task.is_completed = True
-    task.completed_at = datetime.utcnow()
-    if actual_hours:
-        task.actual_hours = actual_hours
+    def write(session: Session):
+        task = session.query(Task).filter(Task.id == task_id, Task.owner_id == user_id).first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        
+        task.is_completed = True
+        task.completed_at = datetime.utcnow()
+        if actual_hours:
+            task.actual_hours = actual_hours
+        session.flush()
+        return task.version
     
-    db.commit()
+    version = run_write(db, write)
+    scheduler.task_removed(current_user.id, task_id, version)
+    result_cache.invalidate(current_user.id, TASKS)
     return {"message": "Task completed successfully"}
 
 @router.put("/{task_id}")
@@ -59,6 +83,8 @@ def update_task(task_id: int, task_update: TaskCreate, current_user: User = Depe
     
     db.commit()
     db.refresh(task)
+    scheduler.task_changed(task)
+    result_cache.invalidate(current_user.id, TASKS)
     return task
 
 @router.delete("/{task_id}")
@@ -69,7 +95,12 @@ def delete_task(task_id: int, current_user: User = Depends(get_current_user), db
         raise HTTPException(status_code=404, detail="Task not found")
     
     db.delete(task)
+    db.flush()
+    # The tombstone's version; the user's row stays locked until the commit
+    version = db.query(User.change_seq).filter(User.id == current_user.id).scalar()
     db.commit()
+    scheduler.task_removed(current_user.id, task_id, version)
+    result_cache.invalidate(current_user.id, TASKS)
     return {"message": "Task deleted successfully"}
 
 @router.get("/today/")
@@ -81,5 +112,15 @@ def get_today_tasks(current_user: User = Depends(get_current_user), db: Session
         Task.due_date >= today,
         Task.due_date < today + timedelta(days=1),
         Task.is_completed == False
-    ).order_by(Task.priority.desc()).all()
-    return tasks
\ No newline at end of file
+    ).order_by(Task.priority.desc(), Task.due_date).all()
+    return tasks
+
+@router.get("/schedule/")
+def get_schedule(days: int = 7, hours_per_day: int = 8, day_start_hour: int = 9, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Pack open tasks into hourly slots over the coming days"""
+    if not 1 <= days <= 90:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 90")
+    if not 1 <= hours_per_day <= 24 or not 0 <= day_start_hour <= 24 - hours_per_day:
+        raise HTTPException(status_code=400, detail="Working hours must fit within a day")
+    
+    return scheduler.plan_for_user(db, current_user.id, datetime.now(), days, hours_per_day, day_start_hour)
\ No newline at end of file
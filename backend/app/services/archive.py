@@ -0,0 +1,244 @@
+"""Tiered archival of old habit entries and completed tasks.
+
+Analytics only look back a few weeks, yet habit_entries gains a row per
+habit per day and completed tasks are never removed. ``run_archive`` moves
+habit entries and completed tasks from before the archive cutoff (the start
+of the month ``NEUROFLOW_ARCHIVE_HORIZON_DAYS`` ago) into the ``archive``
+schema (a separate database file attached on SQLite, a schema of the main
+database on PostgreSQL), one row per habit-month or user-month
+holding the moved rows as zlib-compressed JSON columns. Monthly task totals
+are left behind in ``task_summaries`` for the overview and productivity
+analytics; the heatmap bitsets in ``habit_years`` are untouched.
+
+The history routes merge ``archived_habit_entries`` / ``archived_tasks``,
+which restore archived rows as detached read-only model instances, with the
+hot rows. The analytics that need every row (estimation and habit insights)
+read ``archived_task_columns`` / ``archived_entry_columns`` instead, which
+skip building model instances. Rows are moved rather than deleted, so no sync tombstones are
+written. Run it periodically, e.g. nightly::
+
+    python -m app.services.archive --horizon-days 365
+"""
+import argparse
+import json
+import os
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List
+from sqlalchemy import Date, DateTime, delete, select
+from sqlalchemy.orm import Session
+from ..models.database import ArchiveBase, Base, SessionLocal, engine as default_engine
+from ..models.models import Habit, HabitEntry, HabitEntryChunk, Task, TaskChunk, TaskSummary
+from ..utils.cache import HABITS, TASKS, result_cache
+
+ARCHIVE_HORIZON_DAYS = int(os.getenv("NEUROFLOW_ARCHIVE_HORIZON_DAYS", "365"))
+DELETE_BATCH = 500
+
+def archive_cutoff(today: date, horizon_days: int = ARCHIVE_HORIZON_DAYS) -> date:
+    """Rows before this date are archived; a month boundary, so months are archived whole."""
+    return (today - timedelta(days=horizon_days)).replace(day=1)
+
+def _month(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def _columns(model, rows: List[dict]) -> Dict[str, list]:
+    return {
+        column.name: [value.isoformat() if isinstance(value, date) else value for value in (row[column.name] for row in rows)]
+        for column in model.__table__.columns
+    }
+
+def _pack(columns: Dict[str, list]) -> bytes:
+    return zlib.compress(json.dumps(columns, separators=(",", ":")).encode(), 9)
+
+def _unpack(payload: bytes) -> Dict[str, list]:
+    return json.loads(zlib.decompress(payload))
+
+def _restore(model, columns: Dict[str, list]) -> list:
+    """Turn unpacked columns back into detached ``model`` instances."""
+    parsers = {}
+    for column in model.__table__.columns:
+        if column.name not in columns:
+            continue  # added to the model after the chunk was written
+        if isinstance(column.type, DateTime):
+            parsers[column.name] = datetime.fromisoformat
+        elif isinstance(column.type, Date):
+            parsers[column.name] = date.fromisoformat
+        else:
+            parsers[column.name] = None
+    names = list(parsers)
+    instances = []
+    for values in zip(*(columns[name] for name in names)):
+        row = {}
+        for name, value in zip(names, values):
+            parse = parsers[name]
+            row[name] = parse(value) if parse is not None and value is not None else value
+        instances.append(model(**row))
+    return instances
+
+def _store_chunk(db: Session, chunk_model, model, key: dict, month: date, rows: List[dict], unique: str = None):
+    """Append ``rows`` to the chunk for ``key`` and ``month``, creating it if needed.
+
+    With ``unique``, archived rows sharing that column's value with a new row
+    are replaced by it. Returns all of the chunk's columns.
+    """
+    columns = _columns(model, rows)
+    chunk = db.query(chunk_model).filter_by(**key, month=month).first()
+    if chunk is None:
+        db.add(chunk_model(**key, month=month, rows=len(rows), payload=_pack(columns)))
+        return columns
+    merged = _unpack(chunk.payload)
+    keep = range(chunk.rows)
+    if unique is not None:
+        replaced = set(columns[unique])
+        keep = [i for i in keep if merged[unique][i] not in replaced]
+    for name, values in columns.items():
+        existing = merged.get(name, [None] * chunk.rows)
+        merged[name] = [existing[i] for i in keep] + values
+    chunk.payload = _pack(merged)
+    chunk.rows = len(keep) + len(rows)
+    return merged
+
+def _delete_rows(db: Session, model, ids: List[int]):
+    for start in range(0, len(ids), DELETE_BATCH):
+        db.execute(delete(model).where(model.id.in_(ids[start:start + DELETE_BATCH])))
+
+def archive_habit_entries(db: Session, habit_id: int, cutoff: date) -> int:
+    """Move one habit's entries before ``cutoff`` to the archive.
+
+    The archive chunks are committed first; the deletes are left for the
+    caller to commit (see ``run_archive``).
+    """
+    rows = db.execute(
+        select(HabitEntry.__table__).where(HabitEntry.habit_id == habit_id, HabitEntry.day < cutoff)
+    ).mappings().all()
+    months = defaultdict(list)
+    for row in rows:
+        months[_month(row["day"])].append(row)
+
+    for month, group in months.items():
+        _store_chunk(db, HabitEntryChunk, HabitEntry, {"habit_id": habit_id}, month, group, unique="day")
+    db.commit()
+
+    _delete_rows(db, HabitEntry, [row["id"] for row in rows])
+    return len(rows)
+
+def archive_tasks(db: Session, owner_id: int, cutoff: date) -> int:
+    """Move one user's tasks completed before ``cutoff`` to the archive, like ``archive_habit_entries``."""
+    rows = db.execute(
+        select(Task.__table__).where(
+            Task.owner_id == owner_id,
+            Task.is_completed == True,
+            Task.completed_at < datetime.combine(cutoff, time.min),
+        )
+    ).mappings().all()
+    months = defaultdict(list)
+    for row in rows:
+        months[_month(row["completed_at"])].append(row)
+
+    chunks = {
+        month: _store_chunk(db, TaskChunk, Task, {"owner_id": owner_id}, month, group, unique="id")
+        for month, group in months.items()
+    }
+    db.commit()
+
+    # Summaries are recomputed from the whole chunk, so re-archiving a month stays exact
+    for month, chunk in chunks.items():
+        totals = defaultdict(lambda: [0, 0.0, 0.0])
+        for priority, estimated, actual in zip(chunk["priority"], chunk["estimated_hours"], chunk["actual_hours"]):
+            total = totals[priority or "medium"]
+            total[0] += 1
+            total[1] += estimated or 0
+            total[2] += actual or 0
+        for priority, (tasks, estimated, actual) in totals.items():
+            summary = db.query(TaskSummary).filter_by(owner_id=owner_id, month=month, priority=priority).first()
+            if summary is None:
+                summary = TaskSummary(owner_id=owner_id, month=month, priority=priority)
+                db.add(summary)
+            summary.tasks = tasks
+            summary.estimated_hours = estimated
+            summary.actual_hours = actual
+
+    _delete_rows(db, Task, [row["id"] for row in rows])
+    return len(rows)
+
+def run_archive(db: Session, horizon_days: int = ARCHIVE_HORIZON_DAYS, today: date = None) -> dict:
+    """Archive everything older than the horizon, habit by habit and user by user.
+
+    Short transactions keep the database available to the API while a large
+    backlog is archived. In WAL mode a transaction spanning the main and
+    archive databases is not atomic across the two, so each step commits the
+    archive chunks before deleting the rows they hold: a crash in between
+    leaves rows in both places, which the history reads de-duplicate and the
+    next run folds back in, but never loses them.
+    """
+    cutoff = archive_cutoff(today or date.today(), horizon_days)
+
+    entries = 0
+    habits = db.execute(
+        select(HabitEntry.habit_id, Habit.owner_id).join(Habit).where(HabitEntry.day < cutoff).distinct()
+    ).all()
+    for habit_id, owner_id in habits:
+        entries += archive_habit_entries(db, habit_id, cutoff)
+        db.commit()
+        result_cache.invalidate(owner_id, HABITS)
+
+    tasks = 0
+    owners = db.execute(
+        select(Task.owner_id).where(
+            Task.is_completed == True, Task.completed_at < datetime.combine(cutoff, time.min)
+        ).distinct()
+    ).scalars().all()
+    for owner_id in owners:
+        tasks += archive_tasks(db, owner_id, cutoff)
+        db.commit()
+        result_cache.invalidate(owner_id, TASKS)
+
+    return {"cutoff": cutoff, "habit_entries": entries, "tasks": tasks}
+
+def archived_habit_entries(db: Session, habit_id: int) -> List[HabitEntry]:
+    payloads = db.execute(
+        select(HabitEntryChunk.payload).where(HabitEntryChunk.habit_id == habit_id).order_by(HabitEntryChunk.month)
+    ).scalars()
+    return [entry for payload in payloads for entry in _restore(HabitEntry, _unpack(payload))]
+
+def archived_entries(db: Session, habit_ids: Iterable[int]) -> List[HabitEntry]:
+    """The archived entries of all of ``habit_ids``, like ``archived_habit_entries``."""
+    payloads = db.execute(
+        select(HabitEntryChunk.payload).where(HabitEntryChunk.habit_id.in_(list(habit_ids))).order_by(HabitEntryChunk.month)
+    ).scalars()
+    return [entry for payload in payloads for entry in _restore(HabitEntry, _unpack(payload))]
+
+def archived_tasks(db: Session, owner_id: int) -> List[Task]:
+    payloads = db.execute(
+        select(TaskChunk.payload).where(TaskChunk.owner_id == owner_id).order_by(TaskChunk.month)
+    ).scalars()
+    return [task for payload in payloads for task in _restore(Task, _unpack(payload))]
+
+def _archived_columns(db: Session, chunk_model, model, condition) -> Dict[str, list]:
+    """The archived columns of every chunk matching ``condition``, concatenated."""
+    merged = {column.name: [] for column in model.__table__.columns}
+    for rows, payload in db.execute(select(chunk_model.rows, chunk_model.payload).where(condition)):
+        columns = _unpack(payload)
+        for name, values in merged.items():
+            values.extend(columns.get(name, [None] * rows))
+    return merged
+
+def archived_task_columns(db: Session, owner_id: int) -> Dict[str, list]:
+    """A user's archived tasks as columns; datetimes are ISO strings and priorities names."""
+    return _archived_columns(db, TaskChunk, Task, TaskChunk.owner_id == owner_id)
+
+def archived_entry_columns(db: Session, habit_ids: Iterable[int]) -> Dict[str, list]:
+    """The archived entries of ``habit_ids`` as columns; dates are ISO strings."""
+    return _archived_columns(db, HabitEntryChunk, HabitEntry, HabitEntryChunk.habit_id.in_(list(habit_ids)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old habit entries and completed tasks to the archive database")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=default_engine)
+    ArchiveBase.metadata.create_all(bind=default_engine)
+    with SessionLocal() as db:
+        result = run_archive(db, args.horizon_days)
+    print(f"Archived {result['habit_entries']} habit entries and {result['tasks']} tasks from before {result['cutoff']}")
@@ -0,0 +1,311 @@
+"""Online backups of the SQLite databases as point-in-time snapshots.
+
+``create_snapshot`` copies neuroflow.db and then the archive database with
+SQLite's online backup API, ``BACKUP_STEP_PAGES`` pages per step and a
+``BACKUP_STEP_SLEEP_MS`` pause between steps, so the copy never holds the
+database for long and its I/O is spread out while the API keeps serving.
+The main database is copied first: archival commits archived rows before
+deleting them from the main database, so a later archive copy always holds
+whatever the earlier main copy is missing.
+
+Normally a write through another connection makes SQLite restart the copy
+at its next step, so a busy database would never finish. In WAL mode the
+copy instead holds one read transaction open across all steps: every step
+reads the same snapshot, nothing restarts, and writers carry on appending
+to the WAL (which cannot be checkpointed past the snapshot until the copy
+ends). For a database not in WAL mode, where that read transaction would
+block writers, the copy falls back to a single step after
+``BACKUP_MAX_RESTARTS`` restarts.
+
+Each snapshot is a directory ``<backup dir>/<UTC timestamp>/`` holding both
+databases and a manifest.json. It is written under a ``.partial`` name
+unique to the process and renamed once every file passes
+``PRAGMA quick_check``. With ``NEUROFLOW_BACKUP_INTERVAL_MINUTES`` set the
+API takes snapshots on that interval from a background thread, keeping the
+newest ``NEUROFLOW_BACKUP_KEEP``. Every worker process starts the thread,
+but only the one holding an exclusive ``flock`` on ``.scheduler.lock`` in
+the backup directory takes snapshots; another worker takes over when that
+process exits. Only SQLite databases are covered: with
+``NEUROFLOW_DATABASE_URL`` pointing at PostgreSQL, use its own tools
+(``pg_basebackup`` with WAL archiving for point-in-time recovery, or
+``pg_dump``). From the command line::
+
+    python -m app.services.backup snapshot
+    python -m app.services.backup list
+    python -m app.services.backup prune --keep 7
+    python -m app.services.backup restore --at 2026-10-19T12:00  # stop the API first
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional
+from ..models.database import ARCHIVE_DATABASE_PATH, engine as default_engine
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so every worker's scheduler runs
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = os.getenv("NEUROFLOW_BACKUP_DIR", "./backups")
+BACKUP_INTERVAL_MINUTES = float(os.getenv("NEUROFLOW_BACKUP_INTERVAL_MINUTES", "0"))
+BACKUP_KEEP = int(os.getenv("NEUROFLOW_BACKUP_KEEP", "7"))
+BACKUP_STEP_PAGES = int(os.getenv("NEUROFLOW_BACKUP_STEP_PAGES", "256"))
+BACKUP_STEP_SLEEP_MS = float(os.getenv("NEUROFLOW_BACKUP_STEP_SLEEP_MS", "10"))
+BACKUP_MAX_RESTARTS = 3
+SNAPSHOT_NAME_FORMAT = "%Y%m%dT%H%M%SZ"
+SCHEDULER_LOCK_FILE = ".scheduler.lock"
+
+class BackupCancelled(Exception):
+    """The backup was stopped before it finished."""
+
+class _TooManyRestarts(Exception):
+    pass
+
+def _require_sqlite():
+    if default_engine.dialect.name != "sqlite":
+        raise RuntimeError(
+            f"Online backups cover SQLite only; back up {default_engine.dialect.name} with its own tools (e.g. pg_basebackup)"
+        )
+
+def database_files() -> Dict[str, str]:
+    """File name inside a snapshot -> live database path, in backup order."""
+    return {"neuroflow.db": default_engine.url.database, "neuroflow_archive.db": ARCHIVE_DATABASE_PATH}
+
+def copy_database(source: str, destination: str, step_pages: int = BACKUP_STEP_PAGES,
+                  step_sleep_ms: float = BACKUP_STEP_SLEEP_MS, max_restarts: int = BACKUP_MAX_RESTARTS,
+                  cancel: Optional[threading.Event] = None) -> dict:
+    """Copy ``source`` to ``destination`` with the online backup API and return copy stats."""
+    stats = {"pages": 0, "steps": 0, "restarts": 0, "single_step": False}
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal last_remaining
+        stats["steps"] += 1
+        stats["pages"] = total
+        if cancel is not None and cancel.is_set():
+            raise BackupCancelled()
+        # Remaining pages only grow when SQLite restarted the copy
+        if last_remaining is not None and remaining > last_remaining:
+            stats["restarts"] += 1
+            if stats["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if remaining and step_sleep_ms:
+            time.sleep(step_sleep_ms / 1000)
+
+    with closing(sqlite3.connect(source, timeout=30, isolation_level=None)) as src, \
+            closing(sqlite3.connect(destination)) as dst:
+        pinned = src.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if pinned:
+            src.execute("BEGIN")
+            src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        try:
+            src.backup(dst, pages=step_pages, progress=progress)
+        except _TooManyRestarts:
+            src.backup(dst, pages=-1)
+            stats["single_step"] = True
+        finally:
+            if pinned:
+                src.execute("COMMIT")
+        # A self-contained file, whatever the live journal mode
+        dst.execute("PRAGMA journal_mode=DELETE")
+        check = dst.execute("PRAGMA quick_check").fetchone()[0]
+    if check != "ok":
+        raise RuntimeError(f"Backup of {source} failed its integrity check: {check}")
+    return stats
+
+def create_snapshot(backup_dir: str = BACKUP_DIR, cancel: Optional[threading.Event] = None, **copy_options) -> dict:
+    """Back up every database into a new snapshot directory and return its manifest."""
+    _require_sqlite()
+    created_at = datetime.utcnow().replace(microsecond=0)
+    name = created_at.strftime(SNAPSHOT_NAME_FORMAT)
+    # Per process, so concurrent snapshots never remove each other's files
+    partial = os.path.join(backup_dir, f"{name}.{os.getpid()}.partial")
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+
+    started = time.monotonic()
+    files = {}
+    try:
+        for file_name, source in database_files().items():
+            if not os.path.exists(source):
+                continue
+            destination = os.path.join(partial, file_name)
+            stats = copy_database(source, destination, cancel=cancel, **copy_options)
+            files[file_name] = dict(stats, bytes=os.path.getsize(destination))
+
+        manifest = {
+            "name": name,
+            "created_at": created_at.isoformat() + "Z",
+            "seconds": round(time.monotonic() - started, 3),
+            "files": files,
+        }
+        with open(os.path.join(partial, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(partial, os.path.join(backup_dir, name))
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    return manifest
+
+def list_snapshots(backup_dir: str = BACKUP_DIR) -> List[dict]:
+    """Manifests of the complete snapshots, oldest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(backup_dir)):
+        path = os.path.join(backup_dir, name, "manifest.json")
+        if not name.endswith(".partial") and os.path.exists(path):
+            with open(path) as f:
+                manifests.append(json.load(f))
+    return manifests
+
+def prune_snapshots(keep: int = BACKUP_KEEP, backup_dir: str = BACKUP_DIR) -> List[str]:
+    """Delete all but the newest ``keep`` snapshots; returns the deleted names."""
+    snapshots = list_snapshots(backup_dir)
+    expired = [manifest["name"] for manifest in snapshots[:max(len(snapshots) - keep, 0)]]
+    for name in expired:
+        shutil.rmtree(os.path.join(backup_dir, name))
+    return expired
+
+def find_snapshot(at: Optional[datetime] = None, backup_dir: str = BACKUP_DIR) -> Optional[dict]:
+    """The newest snapshot taken at or before ``at`` (UTC), or the newest overall."""
+    cutoff = at.strftime(SNAPSHOT_NAME_FORMAT) if at is not None else None
+    candidates = [manifest for manifest in list_snapshots(backup_dir) if cutoff is None or manifest["name"] <= cutoff]
+    return candidates[-1] if candidates else None
+
+def restore_snapshot(name: str, backup_dir: str = BACKUP_DIR):
+    """Overwrite the live databases with snapshot ``name``. The API must be stopped.
+
+    The restore rolls every user's ``change_seq`` back, so it also starts a
+    new sync epoch: clients that synced past the snapshot then resync from
+    scratch instead of skipping the reused versions. A shared result cache
+    (``NEUROFLOW_CACHE_URL``) still holds results computed after the
+    snapshot; flush its ``nf:*`` keys before starting the API again.
+    """
+    _require_sqlite()
+    snapshot_dir = os.path.join(backup_dir, name)
+    for file_name, target in database_files().items():
+        source = os.path.join(snapshot_dir, file_name)
+        if not os.path.exists(source):
+            continue
+        # Copying through the backup API (rather than the file) also resets the live WAL
+        copy_database(source, target, step_pages=-1)
+        with closing(sqlite3.connect(target)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    # Snapshots predating the table get it, with a fresh epoch, on API startup
+    with closing(sqlite3.connect(database_files()["neuroflow.db"])) as conn:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sync_epoch'").fetchone():
+            with conn:
+                conn.execute("UPDATE sync_epoch SET epoch = ?", (uuid.uuid4().hex,))
+
+class BackupScheduler:
+    """Background thread taking a snapshot every ``interval_minutes``.
+
+    Under ``uvicorn --workers N`` each worker has one; they elect a single
+    process through the lock file so each interval gets one snapshot.
+    """
+
+    def __init__(self, interval_minutes: float, keep: int = BACKUP_KEEP, backup_dir: str = BACKUP_DIR):
+        self._interval = interval_minutes * 60
+        self._keep = keep
+        self._backup_dir = backup_dir
+        self._stop = threading.Event()
+        self._lock_file = None  # open and flocked while this process is the elected one
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the thread, abandoning a backup in progress."""
+        self._stop.set()
+        self._thread.join()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _elected(self) -> bool:
+        """Whether this process takes the snapshots, acquiring the lock if it is free."""
+        if fcntl is None or self._lock_file is not None:
+            return True
+        os.makedirs(self._backup_dir, exist_ok=True)
+        lock_file = open(os.path.join(self._backup_dir, SCHEDULER_LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                if not self._elected():
+                    continue
+                manifest = create_snapshot(self._backup_dir, cancel=self._stop)
+                prune_snapshots(self._keep, self._backup_dir)
+                logger.info("Backup snapshot %s written in %.1fs", manifest["name"], manifest["seconds"])
+            except BackupCancelled:
+                return
+            except Exception:
+                logger.exception("Scheduled backup failed")
+
+_scheduler: Optional[BackupScheduler] = None
+
+def start():
+    """Start scheduled backups when ``NEUROFLOW_BACKUP_INTERVAL_MINUTES`` is set."""
+    global _scheduler
+    if BACKUP_INTERVAL_MINUTES > 0 and default_engine.dialect.name != "sqlite":
+        logger.warning("NEUROFLOW_BACKUP_INTERVAL_MINUTES is ignored: scheduled backups cover SQLite only")
+    elif BACKUP_INTERVAL_MINUTES > 0 and _scheduler is None:
+        _scheduler = BackupScheduler(BACKUP_INTERVAL_MINUTES)
+
+def shutdown():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.close()
+        _scheduler = None
+
+def main():
+    parser = argparse.ArgumentParser(description="Online backups of the NeuroFlow databases")
+    parser.add_argument("--dir", default=BACKUP_DIR, help="backup directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("snapshot", help="take a snapshot now")
+    commands.add_parser("list", help="list snapshots")
+    prune = commands.add_parser("prune", help="delete all but the newest snapshots")
+    prune.add_argument("--keep", type=int, default=BACKUP_KEEP)
+    restore = commands.add_parser("restore", help="restore a snapshot (stop the API first)")
+    restore.add_argument("name", nargs="?", help="snapshot name; default the newest")
+    restore.add_argument("--at", type=datetime.fromisoformat, help="newest snapshot at or before this UTC time")
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        manifest = create_snapshot(args.dir)
+        print(f"Snapshot {manifest['name']} written in {manifest['seconds']}s")
+    elif args.command == "list":
+        for manifest in list_snapshots(args.dir):
+            size = sum(file["bytes"] for file in manifest["files"].values())
+            print(f"{manifest['name']}  {size / 1e6:10.1f} MB  {manifest['seconds']:8.1f}s")
+    elif args.command == "prune":
+        for name in prune_snapshots(args.keep, args.dir):
+            print(f"Deleted {name}")
+    else:
+        manifest = {"name": args.name} if args.name else find_snapshot(args.at, args.dir)
+        if manifest is None or not os.path.isdir(os.path.join(args.dir, manifest["name"])):
+            parser.error("no matching snapshot")
+        restore_snapshot(manifest["name"], args.dir)
+        print(f"Restored snapshot {manifest['name']}; flush the shared result cache (nf:* keys) if NEUROFLOW_CACHE_URL is set")
+
+if __name__ == "__main__":
+    main()
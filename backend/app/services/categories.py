@@ -0,0 +1,32 @@
+from sqlalchemy.orm import Session
+from threading import Lock
+from typing import Dict
+from ..models.database import dialect_insert
+from ..models.models import Category
+
+# Category names are never renamed or deleted, so ids can be cached per process
+_category_ids: Dict[str, int] = {}
+_category_ids_lock = Lock()
+
+def get_category_id(db: Session, name: str) -> int:
+    """Return the id of the category called ``name``, creating it if needed."""
+    with _category_ids_lock:
+        category_id = _category_ids.get(name)
+    if category_id is not None:
+        return category_id
+
+    inserted = db.execute(
+        dialect_insert(db, Category).values(name=name).on_conflict_do_nothing(index_elements=[Category.name])
+    ).rowcount
+    category_id = db.query(Category.id).filter(Category.name == name).scalar()
+    # A freshly inserted row is only cached once a later call sees it committed
+    if not inserted:
+        with _category_ids_lock:
+            _category_ids[name] = category_id
+    return category_id
+
+def with_category_id(db: Session, values: dict) -> dict:
+    """Replace the ``category`` name in request values with its ``category_id``."""
+    if "category" in values:
+        values["category_id"] = get_category_id(db, values.pop("category"))
+    return values
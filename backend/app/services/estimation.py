@@ -0,0 +1,175 @@
+"""Estimate-vs-actual accuracy and completion forecasts for a user's tasks.
+
+A user's tasks are read in one query into column arrays. Completed tasks
+with both ``estimated_hours`` and ``actual_hours`` give the estimation bias
+(actual / estimated) overall and per priority. Open tasks are then
+forecast by scaling their estimates by that bias and draining them, in
+scheduling order, at the user's recent throughput of actual hours per day.
+Results are cached per user and day until one of their tasks changes.
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from typing import TYPE_CHECKING
+from sqlalchemy import Integer, String, cast, select
+from sqlalchemy.orm import Session
+from ..models.models import Milestone, Task, PRIORITY_CODES, PRIORITY_NAMES
+from ..utils.cache import TASKS, result_cache
+from . import archive
+
+# NumPy is imported on first use, as in habit_insights.py
+if TYPE_CHECKING:
+    import numpy as np
+
+THROUGHPUT_WINDOW_DAYS = 28
+MIN_SAMPLES = 3  # completed tasks needed before a priority gets its own bias
+PERCENTILES = (10, 25, 50, 75, 90)
+
+def load_task_columns(db: Session, user_id: int) -> dict:
+    """Return the user's tasks as a dict of NumPy column arrays."""
+    import numpy as np
+    # priority is read as its raw integer code, timestamps as ISO strings;
+    # DBAPI rows are fetched directly to skip per-row result processing
+    rows = db.connection().execute(
+        select(
+            Task.id,
+            cast(Task.priority, Integer),
+            Task.estimated_hours,
+            Task.actual_hours,
+            cast(Task.is_completed, Integer),
+            cast(Task.completed_at, String),
+            cast(Task.due_date, String),
+            Task.milestone_id,
+        ).where(Task.owner_id == user_id)
+    ).cursor.fetchall()
+
+    # Archived tasks (all completed) count towards the estimate history; a
+    # task in both tiers, left by an interrupted archive run, is counted once
+    archived = archive.archived_task_columns(db, user_id)
+    hot_ids = {row[0] for row in rows}
+    rows += [
+        (task_id, PRIORITY_CODES.get(priority, PRIORITY_CODES["medium"]), estimated, actual, int(bool(completed)),
+         completed_at, due_date, milestone_id)
+        for task_id, priority, estimated, actual, completed, completed_at, due_date, milestone_id in zip(
+            archived["id"], archived["priority"], archived["estimated_hours"], archived["actual_hours"],
+            archived["is_completed"], archived["completed_at"], archived["due_date"], archived["milestone_id"],
+        )
+        if task_id not in hot_ids
+    ]
+
+    columns = list(zip(*rows)) if rows else [()] * 8
+    return {
+        "id": np.array(columns[0], dtype=np.int64),
+        "priority": np.array([PRIORITY_CODES["medium"] if p is None else p for p in columns[1]], dtype=np.int64),
+        "estimated": np.array(columns[2], dtype=float),
+        "actual": np.array(columns[3], dtype=float),
+        "completed": np.array(columns[4], dtype=bool),
+        "completed_at": np.array(columns[5], dtype="datetime64[s]"),
+        "due_date": np.array(columns[6], dtype="datetime64[s]"),
+        "milestone_id": np.array([-1 if m is None else m for m in columns[7]], dtype=np.int64),
+    }
+
+def _error_summary(estimated: np.ndarray, actual: np.ndarray) -> dict:
+    """Bias and error distribution for paired estimates and actuals."""
+    import numpy as np
+    if len(estimated) == 0:
+        return {"samples": 0, "bias": None, "median_ratio": None, "mean_absolute_error_hours": None,
+                "mean_absolute_percentage_error": None, "error_percentiles_hours": None}
+
+    ratio = actual / estimated
+    error = actual - estimated
+    return {
+        "samples": int(len(estimated)),
+        # Geometric mean so that 2x over and 2x under cancel out
+        "bias": round(float(np.exp(np.log(ratio).mean())), 4),
+        "median_ratio": round(float(np.median(ratio)), 4),
+        "mean_absolute_error_hours": round(float(np.abs(error).mean()), 4),
+        "mean_absolute_percentage_error": round(float((np.abs(error) / estimated).mean() * 100), 2),
+        "error_percentiles_hours": {
+            f"p{p}": round(float(value), 4) for p, value in zip(PERCENTILES, np.percentile(error, PERCENTILES))
+        },
+    }
+
+def compute_estimation(columns: dict, now: datetime) -> dict:
+    import numpy as np
+    completed = columns["completed"]
+    estimated = columns["estimated"]
+    actual = columns["actual"]
+    priority = columns["priority"]
+
+    measured = completed & (estimated > 0) & (actual > 0)
+    overall = _error_summary(estimated[measured], actual[measured])
+
+    by_priority = []
+    bias_by_code = {}
+    for code in sorted(PRIORITY_NAMES, reverse=True):
+        in_group = measured & (priority == code)
+        summary = _error_summary(estimated[in_group], actual[in_group])
+        by_priority.append({"priority": PRIORITY_NAMES[code], **summary})
+        if summary["samples"] >= MIN_SAMPLES:
+            bias_by_code[code] = summary["bias"]
+
+    # Throughput: actual hours of tasks completed in the trailing window
+    now64 = np.datetime64(now, "s")
+    window_start = now64 - np.timedelta64(THROUGHPUT_WINDOW_DAYS, "D")
+    recent = completed & (columns["completed_at"] >= window_start)
+    hours_per_day = float(np.nansum(actual[recent])) / THROUGHPUT_WINDOW_DAYS
+
+    open_tasks = ~completed
+    default_bias = overall["bias"] or 1.0
+    bias = np.array([bias_by_code.get(code, default_bias) for code in priority[open_tasks].tolist()], dtype=float)
+    remaining = np.where(np.isnan(estimated[open_tasks]), 1.0, estimated[open_tasks]) * bias
+
+    # Same order as the planner (scheduler.task_key): due day, then highest
+    # priority, then due time; tasks without a due date last
+    due = columns["due_date"][open_tasks]
+    due_sort = np.where(np.isnat(due), np.datetime64("9999-12-31", "s"), due).astype(np.int64)
+    due_day = due_sort // 86400
+    order = np.lexsort((columns["id"][open_tasks], due_sort, -priority[open_tasks], due_day))
+
+    task_forecasts = []
+    milestone_forecasts = []
+    if hours_per_day > 0 and len(order):
+        finish_days = np.cumsum(remaining[order]) / hours_per_day
+        finish = now64 + (finish_days * 86400).astype("timedelta64[s]")
+        ids = columns["id"][open_tasks][order]
+        due_ordered = due[order]
+        late = ~np.isnat(due_ordered) & (finish > due_ordered)
+        for task_id, at, is_late, hours in zip(ids.tolist(), finish.tolist(), late.tolist(), remaining[order].tolist()):
+            task_forecasts.append({
+                "task_id": task_id,
+                "expected_hours": round(hours, 2),
+                "forecast_completion": at,
+                "late": is_late,
+            })
+
+        # A milestone completes when its last open task does
+        milestones = columns["milestone_id"][open_tasks][order]
+        linked = milestones >= 0
+        if linked.any():
+            unique, inverse = np.unique(milestones[linked], return_inverse=True)
+            latest = np.zeros(len(unique), dtype=np.int64)
+            np.maximum.at(latest, inverse, finish[linked].astype(np.int64))
+            for milestone_id, at in zip(unique.tolist(), latest.astype("datetime64[s]").tolist()):
+                milestone_forecasts.append({"milestone_id": milestone_id, "forecast_completion": at})
+
+    return {
+        "overall": overall,
+        "by_priority": by_priority,
+        "throughput_hours_per_day": round(hours_per_day, 4),
+        "open_tasks": int(open_tasks.sum()),
+        "task_forecasts": task_forecasts,
+        "milestone_forecasts": milestone_forecasts,
+    }
+
+def get_estimation(db: Session, user_id: int) -> dict:
+    return result_cache.get_or_compute(user_id, TASKS, f"estimation:{date.today()}", lambda: _estimation(db, user_id))
+
+def _estimation(db: Session, user_id: int) -> dict:
+    result = compute_estimation(load_task_columns(db, user_id), now=datetime.utcnow())
+    if result["milestone_forecasts"]:
+        titles = dict(db.query(Milestone.id, Milestone.title).filter(
+            Milestone.id.in_([item["milestone_id"] for item in result["milestone_forecasts"]])
+        ).all())
+        for item in result["milestone_forecasts"]:
+            item["milestone_title"] = titles.get(item["milestone_id"])
+    return result
@@ -0,0 +1,161 @@
+"""Optional group-commit write path for high-frequency small writes.
+
+With ``NEUROFLOW_GROUP_COMMIT=1`` the hot write routes hand their work to a
+single writer thread instead of committing on their own session. The
+writer takes every write that queued up while the previous batch was
+committing (optionally waiting ``NEUROFLOW_GROUP_COMMIT_WINDOW_MS`` for
+more), runs each in its own SAVEPOINT so one failing write does not sink
+the others, and commits the batch in one transaction: one fsync and one
+database lock acquisition for many requests. Each caller's future resolves with its own result or error.
+
+Write functions take the writer's session, must not commit, and should
+only close over plain values (ids, request data), never objects bound to
+the request's session. The writer's session does not expire on commit, so
+a write returning ORM objects should re-read them (``session.refresh``)
+before returning: otherwise the caller gets the request's values as given
+(e.g. an offset-aware ``due_date``) instead of the stored ones the direct
+path returns.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, TypeVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from ..models.database import engine as default_engine
+
+GROUP_COMMIT_ENABLED = os.getenv("NEUROFLOW_GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("NEUROFLOW_GROUP_COMMIT_WINDOW_MS", "0"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("NEUROFLOW_GROUP_COMMIT_MAX_BATCH", "256"))
+
+T = TypeVar("T")
+Write = Callable[[Session], T]
+
+def _writer_engine(engine: Engine) -> Engine:
+    """A dedicated engine for the writer thread.
+
+    pysqlite's implicit transaction handling breaks SAVEPOINT (releasing the
+    first savepoint commits), so for SQLite the driver's own BEGIN handling
+    is switched off and SQLAlchemy emits BEGIN itself, as recommended in the
+    SQLAlchemy SQLite dialect docs.
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+
+    writer_engine = create_engine(engine.url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(writer_engine, "connect")
+    def disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer_engine, "begin")
+    def emit_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return writer_engine
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued writes in batches."""
+
+    def __init__(self, engine: Engine, window_ms: float = GROUP_COMMIT_WINDOW_MS,
+                 max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self._session_factory = sessionmaker(bind=_writer_engine(engine), autoflush=False, expire_on_commit=False)
+        self._window = window_ms / 1000
+        self._max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Tuple[Write, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, write: Write) -> Future:
+        future = Future()
+        self._queue.put((write, future))
+        return future
+
+    def close(self):
+        """Finish queued writes and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self) -> Tuple[List[Tuple[Write, Future]], bool]:
+        """Block for one write, then gather more until the window closes.
+
+        Returns the batch and whether ``close`` was requested.
+        """
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self._window
+        while len(batch) < self._max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit_batch(self, batch: List[Tuple[Write, Future]]):
+        done = []
+        with self._session_factory() as db:
+            for write, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                savepoint = db.begin_nested()
+                try:
+                    result = write(db)
+                    savepoint.commit()
+                except Exception as exc:
+                    savepoint.rollback()
+                    future.set_exception(exc)
+                else:
+                    done.append((future, result))
+            try:
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                for future, _ in done:
+                    future.set_exception(exc)
+                return
+        for future, result in done:
+            future.set_result(result)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._commit_batch(batch)
+
+_writer: Optional[GroupCommitWriter] = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> Optional[GroupCommitWriter]:
+    """The process-wide writer, started on first use when group commit is enabled."""
+    global _writer
+    if not GROUP_COMMIT_ENABLED:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = GroupCommitWriter(default_engine)
+        return _writer
+
+def shutdown():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+def run_write(db: Session, write: Write) -> T:
+    """Run ``write`` and commit it, via the group-commit writer when enabled."""
+    writer = get_writer()
+    if writer is None:
+        result = write(db)
+        db.commit()
+        return result
+    return writer.submit(write).result()
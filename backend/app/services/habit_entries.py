@@ -0,0 +1,40 @@
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Tuple
+from ..models.database import dialect_insert
+from ..models.models import HabitEntry
+from .heatmaps import record_entry
+from .sync import next_version
+
+# Columns an upsert is allowed to overwrite on an existing (habit_id, day) row
+UPSERT_COLUMNS = ("date", "completed", "notes", "rating")
+
+def upsert_habit_entry(db: Session, owner_id: int, habit_id: int, values: dict) -> Tuple[HabitEntry, bool]:
+    """Insert or update the entry for ``habit_id`` on the day of ``values['date']``.
+
+    Runs as a single ``INSERT ... ON CONFLICT (habit_id, day) DO UPDATE`` so
+    concurrent loggers can never create two rows for the same habit-day.
+    Only the keys present in ``values`` are overwritten on conflict. The row
+    is stamped with the owner's next sync version and the habit's heatmap
+    year is updated in the same transaction; committing is left to the
+    caller. Returns the entry and whether a new row was created.
+    """
+    entry_date: datetime = values["date"]
+    row = {key: values[key] for key in UPSERT_COLUMNS if key in values}
+    row.update(
+        habit_id=habit_id,
+        day=entry_date.date(),
+        created_at=datetime.utcnow(),
+        version=next_version(db.connection(), owner_id),
+    )
+
+    stmt = dialect_insert(db, HabitEntry).values(**row)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[HabitEntry.habit_id, HabitEntry.day],
+        set_={key: stmt.excluded[key] for key in UPSERT_COLUMNS + ("version",) if key in row},
+    ).returning(HabitEntry.id)
+
+    entry_id = db.execute(stmt).scalar_one()
+    entry = db.get(HabitEntry, entry_id, populate_existing=True)
+    record_entry(db, habit_id, entry.day, entry.completed, entry.rating)
+    return entry, entry.created_at == row["created_at"]
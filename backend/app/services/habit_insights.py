@@ -0,0 +1,170 @@
+"""Habit insights computed with NumPy over a user's whole entry history.
+
+All of a user's entries are read in one query into column arrays and laid
+out as a habits x days matrix, so correlations, rating trends, weekday
+effects and rolling consistency are whole-array operations rather than
+per-habit queries. Results are cached per user and day until an entry or
+habit of theirs changes.
+"""
+from __future__ import annotations
+from datetime import date
+from typing import TYPE_CHECKING, List
+from sqlalchemy import Integer, String, cast, select
+from sqlalchemy.orm import Session
+from ..models.models import Habit, HabitEntry
+from ..utils.cache import HABITS, result_cache
+from . import archive
+
+# NumPy is imported where it is used rather than at startup, like passlib and
+# jose in routers/auth.py; it is the slowest import left on the startup path
+if TYPE_CHECKING:
+    import numpy as np
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+CONSISTENCY_WINDOWS = (7, 30)
+
+def load_entry_columns(db: Session, user_id: int):
+    """Return (habit ids, names, entry habit ids, days, completed, ratings) arrays."""
+    import numpy as np
+    conn = db.connection()
+    habits = conn.execute(
+        select(Habit.id, Habit.name).where(Habit.owner_id == user_id, Habit.is_active == True).order_by(Habit.id)
+    ).all()
+    # Every column is a plain int/str/None straight from the driver, so the
+    # DBAPI rows are fetched directly instead of building a Row per entry
+    rows = conn.execute(
+        select(HabitEntry.habit_id, cast(HabitEntry.day, String), cast(HabitEntry.completed, Integer), HabitEntry.rating)
+        .join(Habit)
+        .where(Habit.owner_id == user_id, Habit.is_active == True)
+    ).cursor.fetchall()
+
+    # Archived entries are part of the history; a day in both tiers, left by
+    # an interrupted archive run, is taken from the hot table
+    archived = archive.archived_entry_columns(db, [row[0] for row in habits])
+    hot_days = {(row[0], row[1]) for row in rows}
+    rows += [
+        (habit_id, day, int(bool(completed)), rating)
+        for habit_id, day, completed, rating in zip(
+            archived["habit_id"], archived["day"], archived["completed"], archived["rating"]
+        )
+        if (habit_id, day) not in hot_days
+    ]
+
+    habit_ids = np.array([row[0] for row in habits], dtype=np.int64)
+    names = [row[1] for row in habits]
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return habit_ids, names, empty, empty.astype("datetime64[D]"), empty.astype(bool), empty.astype(float)
+
+    entry_habits, days, completed, ratings = zip(*rows)
+    return (
+        habit_ids,
+        names,
+        np.array(entry_habits, dtype=np.int64),
+        np.array(days, dtype="datetime64[D]"),
+        np.array(completed, dtype=bool),
+        np.array(ratings, dtype=float),  # None becomes NaN
+    )
+
+def _rolling_rate(completion: np.ndarray, window: int) -> np.ndarray:
+    """Completion rate over the trailing ``window`` days, for the last day of each row."""
+    window = min(window, completion.shape[1])
+    return completion[:, -window:].mean(axis=1)
+
+def _row_slopes(values: np.ndarray) -> np.ndarray:
+    """Least-squares slope per row against the column index, ignoring NaNs."""
+    import numpy as np
+    mask = ~np.isnan(values)
+    x = np.broadcast_to(np.arange(values.shape[1], dtype=float), values.shape)
+    count = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.where(mask, x, 0).sum(axis=1) / count
+        mean_y = np.where(mask, values, 0).sum(axis=1) / count
+        dx = np.where(mask, x - mean_x[:, None], 0)
+        dy = np.where(mask, values - mean_y[:, None], 0)
+        slopes = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+    slopes[count < 2] = np.nan
+    return slopes
+
+def _none_if_nan(value) -> float:
+    import numpy as np
+    return None if np.isnan(value) else round(float(value), 4)
+
+def compute_insights(habit_ids: np.ndarray, names: List[str], entry_habits: np.ndarray, days: np.ndarray,
+                     completed: np.ndarray, ratings: np.ndarray, today: date) -> dict:
+    import numpy as np
+    if len(habit_ids) == 0 or len(days) == 0:
+        return {"range": None, "habits": [], "correlations": []}
+
+    start = days.min()
+    end = max(days.max(), np.datetime64(today, "D"))
+    span = int((end - start).astype(int)) + 1
+
+    # Habits x days matrices; entries of inactive habits were filtered in SQL
+    rows = np.searchsorted(habit_ids, entry_habits)
+    cols = (days - start).astype(int)
+    logged = np.zeros((len(habit_ids), span), dtype=bool)
+    done = np.zeros((len(habit_ids), span), dtype=float)
+    rating = np.full((len(habit_ids), span), np.nan)
+    logged[rows, cols] = True
+    done[rows, cols] = completed
+    rating[rows, cols] = ratings
+
+    entry_counts = logged.sum(axis=1)
+    rating_counts = (~np.isnan(rating)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        completion_rate = done.sum(axis=1) / entry_counts
+        rating_mean = np.nansum(rating, axis=1) / rating_counts
+
+    # Day-of-week effect: completion rate among logged days, per weekday.
+    # 1970-01-01 was a Thursday, so (days since epoch + 3) % 7 gives Monday = 0.
+    weekday = (np.arange(span) + start.astype(int) + 3) % 7
+    weekday_onehot = np.eye(7, dtype=float)[weekday]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weekday_rate = (done @ weekday_onehot) / (logged.astype(float) @ weekday_onehot)
+
+    rating_trend = _row_slopes(rating) * 7  # rating points per week
+    consistency = {window: _rolling_rate(done, window) for window in CONSISTENCY_WINDOWS}
+
+    # Pairwise correlation of daily completion; constant series have none
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = np.corrcoef(done) if len(habit_ids) > 1 else np.full((1, 1), np.nan)
+    upper_a, upper_b = np.triu_indices(len(habit_ids), k=1)
+    pair_corr = corr[upper_a, upper_b]
+    valid = ~np.isnan(pair_corr)
+    order = np.argsort(-np.abs(pair_corr[valid]), kind="stable")
+
+    habits = []
+    for i, habit_id in enumerate(habit_ids.tolist()):
+        habits.append({
+            "habit_id": habit_id,
+            "habit_name": names[i],
+            "entries": int(entry_counts[i]),
+            "completion_rate": _none_if_nan(completion_rate[i]),
+            "rating_mean": _none_if_nan(rating_mean[i]),
+            "rating_trend_per_week": _none_if_nan(rating_trend[i]),
+            "weekday_completion": {WEEKDAYS[d]: _none_if_nan(weekday_rate[i, d]) for d in range(7)},
+            **{f"consistency_{window}d": _none_if_nan(consistency[window][i]) for window in CONSISTENCY_WINDOWS},
+        })
+
+    correlations = [
+        {
+            "habit_a": names[a],
+            "habit_b": names[b],
+            "correlation": round(float(value), 4),
+        }
+        for a, b, value in zip(upper_a[valid][order], upper_b[valid][order], pair_corr[valid][order])
+    ]
+
+    return {
+        "range": {"start": str(start), "end": str(end), "days": span},
+        "habits": habits,
+        "correlations": correlations,
+    }
+
+def get_insights(db: Session, user_id: int) -> dict:
+    today = date.today()
+    return result_cache.get_or_compute(
+        user_id, HABITS, f"insights:{today}",
+        lambda: compute_insights(*load_entry_columns(db, user_id), today=today),
+    )
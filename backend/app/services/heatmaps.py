@@ -0,0 +1,115 @@
+"""Year-at-a-glance habit heatmaps backed by packed per-year bitsets.
+
+Each (habit, year) has one ``HabitYear`` row holding a logged bitset, a
+completed bitset and 4-bit ratings, 275 bytes in all. ``record_entry`` keeps
+it current on every entry write, so serving a year for all of a user's
+habits is one indexed read of a few hundred bytes per habit instead of
+fetching and bucketing every ``HabitEntry`` row.
+"""
+from base64 import b64encode
+from datetime import date
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from ..models.database import dialect_insert
+from ..models.models import Habit, HabitEntry, HabitYear
+
+DAYS_IN_YEAR = 366
+BITSET_BYTES = (DAYS_IN_YEAR + 7) // 8
+RATING_BYTES = (DAYS_IN_YEAR + 1) // 2
+
+def _empty_year(habit_id: int, year: int) -> dict:
+    return {
+        "habit_id": habit_id,
+        "year": year,
+        "logged": bytes(BITSET_BYTES),
+        "completed": bytes(BITSET_BYTES),
+        "ratings": bytes(RATING_BYTES),
+    }
+
+def _set_day(logged: bytearray, completed: bytearray, ratings: bytearray,
+             day_index: int, is_completed: bool, rating: Optional[int]):
+    byte, bit = divmod(day_index, 8)
+    logged[byte] |= 1 << bit
+    if is_completed:
+        completed[byte] |= 1 << bit
+    else:
+        completed[byte] &= ~(1 << bit) & 0xFF
+
+    nibble = min(max(rating or 0, 0), 15)
+    byte, high = divmod(day_index, 2)
+    if high:
+        ratings[byte] = (ratings[byte] & 0x0F) | (nibble << 4)
+    else:
+        ratings[byte] = (ratings[byte] & 0xF0) | nibble
+
+def record_entry(db: Session, habit_id: int, day: date, is_completed: bool, rating: Optional[int]):
+    """Fold one entry into its HabitYear row, inside the caller's transaction."""
+    db.execute(
+        dialect_insert(db, HabitYear).values(**_empty_year(habit_id, day.year))
+        .on_conflict_do_nothing(index_elements=[HabitYear.habit_id, HabitYear.year])
+    )
+    # Locks the row where the database supports it; on SQLite the entry upsert
+    # already holds the write lock, so the read-modify-write is serialized
+    year = db.execute(
+        select(HabitYear).where(HabitYear.habit_id == habit_id, HabitYear.year == day.year).with_for_update()
+    ).scalar_one()
+
+    logged, completed, ratings = bytearray(year.logged), bytearray(year.completed), bytearray(year.ratings)
+    _set_day(logged, completed, ratings, day.timetuple().tm_yday - 1, is_completed, rating)
+    year.logged, year.completed, year.ratings = bytes(logged), bytes(completed), bytes(ratings)
+
+def build_years(entries: Iterable[Tuple[int, date, bool, Optional[int]]]) -> dict:
+    """Pack (habit_id, day, completed, rating) rows into HabitYear values by (habit_id, year)."""
+    years = {}
+    for habit_id, day, is_completed, rating in entries:
+        key = (habit_id, day.year)
+        if key not in years:
+            empty = _empty_year(habit_id, day.year)
+            years[key] = (bytearray(empty["logged"]), bytearray(empty["completed"]), bytearray(empty["ratings"]))
+        _set_day(*years[key], day.timetuple().tm_yday - 1, is_completed, rating)
+    return {
+        key: {"habit_id": key[0], "year": key[1], "logged": bytes(logged), "completed": bytes(completed), "ratings": bytes(ratings)}
+        for key, (logged, completed, ratings) in years.items()
+    }
+
+def rebuild_habit_years(db: Session, habit_ids: Optional[Iterable[int]] = None):
+    """Recompute HabitYear rows from habit_entries (all habits by default)."""
+    query = select(HabitEntry.habit_id, HabitEntry.day, HabitEntry.completed, HabitEntry.rating)
+    delete_query = db.query(HabitYear)
+    if habit_ids is not None:
+        habit_ids = list(habit_ids)
+        query = query.where(HabitEntry.habit_id.in_(habit_ids))
+        delete_query = delete_query.filter(HabitYear.habit_id.in_(habit_ids))
+
+    years = build_years(db.execute(query).all())
+    delete_query.delete(synchronize_session=False)
+    if years:
+        db.execute(insert(HabitYear), list(years.values()))
+    db.commit()
+
+def get_year_heatmap(db: Session, user_id: int, year: int, include_ratings: bool = False) -> dict:
+    """Packed completion (and optionally rating) heatmap for all of a user's active habits."""
+    rows = db.execute(
+        select(Habit.id, Habit.name, HabitYear.logged, HabitYear.completed, HabitYear.ratings)
+        .outerjoin(HabitYear, (HabitYear.habit_id == Habit.id) & (HabitYear.year == year))
+        .where(Habit.owner_id == user_id, Habit.is_active == True)
+        .order_by(Habit.id)
+    ).all()
+
+    empty = _empty_year(0, year)
+    return {
+        "year": year,
+        "days": (date(year, 12, 31) - date(year, 1, 1)).days + 1,
+        "encoding": "base64; logged/completed: bit n%8 of byte n//8, ratings: 4-bit nibble n%2 (low first) of byte n//2, n = day of year - 1",
+        "habits": [
+            {
+                "habit_id": habit_id,
+                "habit_name": name,
+                "logged": b64encode(logged or empty["logged"]).decode(),
+                "completed": b64encode(completed or empty["completed"]).decode(),
+                **({"ratings": b64encode(ratings or empty["ratings"]).decode()} if include_ratings else {}),
+            }
+            for habit_id, name, logged, completed, ratings in rows
+        ],
+    }
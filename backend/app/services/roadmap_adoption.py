@@ -0,0 +1,69 @@
+"""Copy-on-adopt instantiation of predefined roadmaps.
+
+Predefined roadmaps are shared templates. Adopting one gives the user a
+private copy of the roadmap and its milestones, plus one study task per day
+of the roadmap, so progress is tracked per user and never on the template.
+The roadmap and milestones are copied with ``INSERT ... SELECT`` and the
+day tasks written with a single multi-row insert, all in one transaction.
+"""
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import Session
+from ..models.models import Milestone, Roadmap, Task
+from .sync import next_version
+
+def adopt_roadmap(db: Session, user_id: int, template: Roadmap, start_date: date, hours_per_day: float) -> int:
+    """Clone ``template`` for ``user_id`` starting on ``start_date``; returns the new roadmap id.
+
+    The caller commits.
+    """
+    now = datetime.utcnow()
+    version = next_version(db.connection(), user_id)
+
+    roadmap_id = db.execute(
+        insert(Roadmap).from_select(
+            ["title", "description", "category_id", "is_predefined", "duration_days", "source_roadmap_id",
+             "owner_id", "created_at", "updated_at", "version"],
+            select(
+                Roadmap.title, Roadmap.description, Roadmap.category_id, literal(False), Roadmap.duration_days,
+                Roadmap.id, literal(user_id), literal(now), literal(now), literal(version),
+            ).where(Roadmap.id == template.id)
+        ).returning(Roadmap.id)
+    ).scalar_one()
+
+    milestones = db.execute(
+        insert(Milestone).from_select(
+            ["title", "description", "day", "is_completed", "roadmap_id", "created_at"],
+            select(
+                Milestone.title, Milestone.description, Milestone.day, literal(False), literal(roadmap_id), literal(now),
+            ).where(Milestone.roadmap_id == template.id)
+        ).returning(Milestone.id, Milestone.day, Milestone.title)
+    ).all()
+    if not milestones:
+        return roadmap_id
+
+    # Each day belongs to the latest milestone that has started by then
+    milestones.sort(key=lambda row: row.day)
+    duration = template.duration_days or db.execute(
+        select(func.max(Milestone.day)).where(Milestone.roadmap_id == template.id)
+    ).scalar()
+    tasks = []
+    current = 0
+    for day in range(milestones[0].day, duration + 1):
+        while current + 1 < len(milestones) and milestones[current + 1].day <= day:
+            current += 1
+        milestone = milestones[current]
+        tasks.append({
+            "title": f"Day {day}: {milestone.title}",
+            "description": f"{template.title}, day {day}",
+            "due_date": datetime.combine(start_date + timedelta(days=day - 1), time(23, 59)),
+            "is_completed": False,
+            "priority": "medium",
+            "estimated_hours": hours_per_day,
+            "owner_id": user_id,
+            "milestone_id": milestone.id,
+            "created_at": now,
+            "version": version,
+        })
+    db.execute(insert(Task), tasks)
+    return roadmap_id
@@ -0,0 +1,202 @@
+"""Hourly planner: packs a user's open tasks into working-hour slots.
+
+Open tasks are kept in a per-user queue ordered by due day, then priority,
+then due time: deadlines come first, but among the tasks due on the same day
+a higher priority goes earlier whatever its time of day. (Priority never
+moves a task ahead of one due on an earlier day, which could only make that
+one later.) A plan walks the queue packing each task into the next free
+hours; a task too big for the capacity left is skipped and counted as
+unscheduled, and the tasks behind it still get planned.
+
+Creating, completing or deleting a task updates the cached queue in place
+(binary search insert/remove) instead of re-reading and re-sorting every
+open task. Each queue records the owner's ``change_seq`` it reflects (see
+services/sync.py); a change is applied in place only when it is the very
+next version, and a plan reloads the queue whenever the user's
+``change_seq`` has moved past it, so writes made through other worker
+processes are never missed. At most ``NEUROFLOW_SCHEDULE_CACHE_USERS``
+queues are kept per worker; the least recently planned one is evicted
+first and simply reloads on its owner's next plan.
+"""
+import os
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from math import ceil
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..models.models import Task, User, PRIORITY_CODES
+
+DEFAULT_TASK_HOURS = 1
+MAX_CACHED_QUEUES = int(os.getenv("NEUROFLOW_SCHEDULE_CACHE_USERS", "256"))
+
+# (no due date, due day, priority rank, due date, task id)
+QueueKey = Tuple[bool, date, int, datetime, int]
+
+def task_key(task_id: int, due_date: Optional[datetime], priority: Optional[str]) -> QueueKey:
+    due_date = due_date or datetime.max
+    return (
+        due_date == datetime.max,
+        due_date.date(),
+        -PRIORITY_CODES.get(priority, PRIORITY_CODES["medium"]),
+        due_date,
+        task_id,
+    )
+
+def task_slots(estimated_hours: Optional[float]) -> int:
+    """Number of whole hourly slots a task occupies."""
+    if not estimated_hours or estimated_hours <= 0:
+        return DEFAULT_TASK_HOURS
+    return ceil(estimated_hours)
+
+class TaskQueue:
+    """Open tasks for one user, sorted in scheduling order."""
+
+    def __init__(self, version: int = 0):
+        self.version = version  # owner's change_seq this queue reflects
+        self._keys: List[QueueKey] = []
+        self._entries: Dict[int, Tuple[QueueKey, int]] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, task_id: int, due_date: Optional[datetime], priority: Optional[str], estimated_hours: Optional[float]):
+        self.remove(task_id)
+        key = task_key(task_id, due_date, priority)
+        insort(self._keys, key)
+        self._entries[task_id] = (key, task_slots(estimated_hours))
+
+    def remove(self, task_id: int):
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return
+        index = bisect_left(self._keys, entry[0])
+        del self._keys[index]
+
+    def plan(self, start: datetime, days: int, hours_per_day: int, day_start_hour: int) -> dict:
+        """Assign queued tasks to hourly slots from ``start`` over ``days`` days."""
+        first_day = start.replace(hour=day_start_hour, minute=0, second=0, microsecond=0)
+        # Skip working hours already gone by today
+        elapsed = ceil((start - first_day).total_seconds() / 3600) if start > first_day else 0
+        cursor = min(max(elapsed, 0), hours_per_day)
+        capacity = days * hours_per_day
+
+        def slot_time(slot: int) -> datetime:
+            day, hour = divmod(slot, hours_per_day)
+            return first_day + timedelta(days=day, hours=hour)
+
+        scheduled = []
+        for key in self._keys:
+            if cursor == capacity:
+                break
+            slots = self._entries[key[-1]][1]
+            if cursor + slots > capacity:
+                continue
+            blocks = []
+            remaining = slots
+            while remaining:
+                in_day = min(remaining, hours_per_day - cursor % hours_per_day)
+                blocks.append({"start": slot_time(cursor), "end": slot_time(cursor + in_day - 1) + timedelta(hours=1)})
+                cursor += in_day
+                remaining -= in_day
+            end = blocks[-1]["end"]
+            due_date = None if key[0] else key[3]
+            scheduled.append({
+                "task_id": key[-1],
+                "hours": slots,
+                "blocks": blocks,
+                "due_date": due_date,
+                "late": due_date is not None and end > due_date,
+            })
+
+        return {
+            "scheduled": scheduled,
+            "unscheduled_count": len(self._keys) - len(scheduled),
+            "capacity_hours": capacity,
+            "planned_hours": sum(item["hours"] for item in scheduled),
+        }
+
+_queues: "OrderedDict[int, TaskQueue]" = OrderedDict()  # least recently planned first
+_queues_lock = Lock()
+_load_locks: Dict[int, Lock] = {}  # one per user, so a queue is loaded once at a time
+
+def _store(user_id: int, queue: TaskQueue):
+    """Cache ``queue`` as most recently used, evicting the least recently used beyond the limit."""
+    _queues[user_id] = queue
+    _queues.move_to_end(user_id)
+    while len(_queues) > MAX_CACHED_QUEUES:
+        evicted, _ = _queues.popitem(last=False)
+        _load_locks.pop(evicted, None)
+
+def current_version(db: Session, user_id: int) -> int:
+    return db.query(User.change_seq).filter(User.id == user_id).scalar() or 0
+
+def load_queue(db: Session, user_id: int) -> TaskQueue:
+    """Build a user's queue from the database, reading only the needed columns."""
+    # The version is read first: a write landing in between then shows up in
+    # the rows but not the version, which only causes another reload later
+    queue = TaskQueue(current_version(db, user_id))
+    rows = db.query(Task.id, Task.due_date, Task.priority, Task.estimated_hours).filter(
+        Task.owner_id == user_id,
+        Task.is_completed == False
+    ).all()
+    entries = [(task_key(row.id, row.due_date, row.priority), task_slots(row.estimated_hours)) for row in rows]
+    entries.sort()
+    queue._keys = [key for key, _ in entries]
+    queue._entries = {key[-1]: (key, slots) for key, slots in entries}
+    return queue
+
+def plan_for_user(db: Session, user_id: int, start: datetime, days: int, hours_per_day: int, day_start_hour: int) -> dict:
+    """Plan a user's open tasks, (re)loading their queue when it is missing or behind."""
+    version = current_version(db, user_id)
+    with _queues_lock:
+        queue = _queues.get(user_id)
+        if queue is not None and queue.version >= version:
+            _queues.move_to_end(user_id)
+            return queue.plan(start, days, hours_per_day, day_start_hour)
+        load_lock = _load_locks.setdefault(user_id, Lock())
+
+    with load_lock:
+        with _queues_lock:
+            queue = _queues.get(user_id)
+            if queue is not None and queue.version >= version:
+                return queue.plan(start, days, hours_per_day, day_start_hour)
+        loaded = load_queue(db, user_id)
+        with _queues_lock:
+            queue = _queues.get(user_id)
+            if queue is None or queue.version < loaded.version:
+                queue = loaded
+            _store(user_id, queue)
+            return queue.plan(start, days, hours_per_day, day_start_hour)
+
+def _apply(user_id: int, version: int, change):
+    """Apply ``change`` to the cached queue if ``version`` is the next one it expects.
+
+    Otherwise the queue missed some write (e.g. one made by another worker)
+    and is left alone for the next plan to reload.
+    """
+    with _queues_lock:
+        queue = _queues.get(user_id)
+        if queue is None or queue.version != version - 1:
+            return
+        change(queue)
+        queue.version = version
+
+def task_changed(task: Task):
+    """Reflect a created or updated task in the owner's cached queue, if any."""
+    if task.is_completed:
+        _apply(task.owner_id, task.version, lambda queue: queue.remove(task.id))
+    else:
+        _apply(task.owner_id, task.version,
+               lambda queue: queue.add(task.id, task.due_date, task.priority, task.estimated_hours))
+
+def task_removed(user_id: int, task_id: int, version: int):
+    """Drop a completed or deleted task, written at ``version``, from the owner's cached queue, if any."""
+    _apply(user_id, version, lambda queue: queue.remove(task_id))
+
+def invalidate(user_id: int):
+    """Forget a user's cached queue after bulk task changes; it reloads on next plan."""
+    with _queues_lock:
+        _queues.pop(user_id, None)
+        _load_locks.pop(user_id, None)
@@ -0,0 +1,71 @@
+"""Per-user change sequence numbers for delta sync.
+
+Every user has a monotonically increasing ``change_seq``. Each write to one
+of their tasks, habits, roadmaps or habit entries stamps the row's
+``version`` with a freshly allocated sequence number, and hard deletes leave
+a ``Tombstone`` with one. A client that remembers the last version it saw
+can then fetch exactly the rows changed since, via indexed
+``(owner, version)`` range scans.
+
+ORM writes are stamped automatically by the ``before_flush`` hook below;
+Core statements (such as the habit entry upsert) call ``next_version``.
+
+Versions are only comparable within one ``SyncEpoch``. Restoring a backup
+rolls ``change_seq`` back and starts a new epoch, so a client holding a
+version from the old one resyncs from scratch (see routers/sync.py).
+"""
+from typing import Optional
+from sqlalchemy import event, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from ..models.models import Habit, Roadmap, SyncEpoch, Task, Tombstone, User
+
+SYNCED_MODELS = (Task, Habit, Roadmap)
+
+def next_version(connection: Connection, user_id: int) -> int:
+    """Allocate the user's next change sequence number.
+
+    The UPDATE takes the user's row lock for the rest of the transaction, so
+    versions become visible in the order they were allocated.
+    """
+    return connection.execute(
+        update(User.__table__)
+        .where(User.__table__.c.id == user_id)
+        .values(change_seq=User.__table__.c.change_seq + 1)
+        .returning(User.__table__.c.change_seq)
+    ).scalar_one()
+
+_epoch: Optional[str] = None
+
+def database_epoch(db: Session) -> str:
+    """The database's sync epoch, read once per process (it only changes on a restore, with the API stopped)."""
+    global _epoch
+    if _epoch is None:
+        _epoch = db.query(SyncEpoch.epoch).filter(SyncEpoch.id == 1).scalar()
+    return _epoch
+
+@event.listens_for(Session, "before_flush")
+def stamp_versions(session: Session, flush_context, instances):
+    versions = {}
+
+    def version_for(user_id: int) -> int:
+        if user_id not in versions:
+            versions[user_id] = next_version(session.connection(), user_id)
+        return versions[user_id]
+
+    for obj in session.new:
+        if isinstance(obj, SYNCED_MODELS) and obj.owner_id is not None:
+            obj.version = version_for(obj.owner_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, SYNCED_MODELS) and obj.owner_id is not None and session.is_modified(obj):
+            obj.version = version_for(obj.owner_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, SYNCED_MODELS) and obj.owner_id is not None:
+            session.add(Tombstone(
+                owner_id=obj.owner_id,
+                entity=obj.__tablename__,
+                entity_id=obj.id,
+                version=version_for(obj.owner_id),
+            ))
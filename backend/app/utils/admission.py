@@ -0,0 +1,141 @@
+"""Per-user admission control and rate limiting, as ASGI middleware.
+
+Every request is matched to a ``RouteRule`` and charged against the caller
+for that rule. The caller is the JWT subject when the request carries a
+valid bearer token, otherwise the client address (as for the login and
+register routes, where bcrypt dominates the cost).
+
+- Rate: a token bucket per (caller, rule) refilling at
+  ``NEUROFLOW_RATE_LIMIT_RATE`` tokens per second up to
+  ``NEUROFLOW_RATE_LIMIT_BURST``. A request takes its rule's ``cost``
+  tokens, so expensive routes admit proportionally fewer requests.
+- Concurrency: at most ``concurrency`` requests per (caller, rule) are in
+  flight; further ones are turned away rather than queued.
+
+Rejected requests get 429 with ``Retry-After``. State is in memory, per
+worker process. ``NEUROFLOW_RATE_LIMIT=0`` turns the middleware off.
+"""
+import math
+import os
+import re
+import time
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+from starlette.responses import JSONResponse
+
+RATE_LIMIT_ENABLED = os.getenv("NEUROFLOW_RATE_LIMIT", "1") == "1"
+RATE_LIMIT_RATE = float(os.getenv("NEUROFLOW_RATE_LIMIT_RATE", "20"))
+RATE_LIMIT_BURST = float(os.getenv("NEUROFLOW_RATE_LIMIT_BURST", "40"))
+SWEEP_EVERY = 10_000  # requests between sweeps of idle buckets
+
+class RouteRule(NamedTuple):
+    name: str
+    method: Optional[str]  # None matches any method
+    pattern: str  # regex matched against the start of the path
+    cost: float  # tokens per request; 0 exempts the route
+    concurrency: int = 16
+
+DEFAULT_RULES = (
+    RouteRule("health", "GET", r"/(health)?$", cost=0),
+    RouteRule("auth_token", "POST", r"/api/auth/token$", cost=20, concurrency=2),
+    RouteRule("auth_register", "POST", r"/api/auth/register$", cost=20, concurrency=2),
+    RouteRule("analytics_streaks", "GET", r"/api/analytics/streaks$", cost=5, concurrency=2),
+    RouteRule("analytics", "GET", r"/api/analytics/", cost=3, concurrency=4),
+    RouteRule("schedule", "GET", r"/api/tasks/schedule/", cost=2, concurrency=4),
+    RouteRule("sync", "GET", r"/api/sync/", cost=2, concurrency=2),
+    RouteRule("default", None, r"", cost=1),
+)
+
+Key = Tuple[str, str]
+
+class AdmissionControlMiddleware:
+    def __init__(self, app, rules: Sequence[RouteRule] = DEFAULT_RULES, rate: float = RATE_LIMIT_RATE,
+                 burst: float = RATE_LIMIT_BURST, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.rules = [(rule, re.compile(rule.pattern)) for rule in rules]
+        self.rate = rate
+        self.burst = burst
+        self.enabled = enabled
+        # All state is touched only from the event loop, so it needs no lock
+        self._buckets: Dict[Key, Tuple[float, float]] = {}  # key -> (tokens, updated)
+        self._in_flight: Dict[Key, int] = {}
+        self._requests = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._match(scope["method"], scope["path"])
+        if rule.cost == 0:
+            await self.app(scope, receive, send)
+            return
+
+        key = (_caller(scope), rule.name)
+        retry_after = self._admit(key, rule)
+        if retry_after is not None:
+            response = JSONResponse(
+                {"detail": "Too many requests"}, status_code=429, headers={"Retry-After": str(retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            remaining = self._in_flight[key] - 1
+            if remaining:
+                self._in_flight[key] = remaining
+            else:
+                del self._in_flight[key]
+
+    def _match(self, method: str, path: str) -> RouteRule:
+        for rule, pattern in self.rules:
+            if (rule.method is None or rule.method == method) and pattern.match(path):
+                return rule
+        return DEFAULT_RULES[-1]
+
+    def _admit(self, key: Key, rule: RouteRule) -> Optional[int]:
+        """Charge ``rule.cost`` to ``key``; returns seconds to wait if the request is rejected."""
+        if self._in_flight.get(key, 0) >= rule.concurrency:
+            return 1
+
+        now = time.monotonic()
+        burst = max(self.burst, rule.cost)
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * self.rate)
+        if tokens < rule.cost:
+            self._buckets[key] = (tokens, now)
+            return max(math.ceil((rule.cost - tokens) / self.rate), 1)
+        self._buckets[key] = (tokens - rule.cost, now)
+
+        self._requests += 1
+        if self._requests % SWEEP_EVERY == 0:
+            self._sweep(now)
+        return None
+
+    def _sweep(self, now: float):
+        """Forget buckets that have refilled completely; a full bucket is the same as none."""
+        idle = self.burst / self.rate
+        for key in [key for key, (_, updated) in self._buckets.items() if now - updated > idle]:
+            del self._buckets[key]
+
+def _caller(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                username = _token_subject(token)
+                if username is not None:
+                    return f"user:{username}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+def _token_subject(token: str) -> Optional[str]:
+    from jose import JWTError, jwt
+    from ..routers.auth import ALGORITHM, SECRET_KEY
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
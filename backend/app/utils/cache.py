@@ -0,0 +1,315 @@
+"""Result cache for per-user analytics, shareable across worker processes.
+
+The backend is chosen by ``NEUROFLOW_CACHE_URL``:
+
+- unset: ``LRUBackend`` with results kept only ``NEUROFLOW_CACHE_LOCAL_TTL``
+  seconds (default 10). Invalidation reaches only the worker that handled
+  the write, so with several workers the others can serve a result that
+  old; ``NEUROFLOW_CACHE_LOCAL_TTL=0`` turns caching off
+- ``redis://host:port/db``: ``RedisBackend`` against any server speaking
+  the Redis protocol, shared by every worker
+- ``unix:///path/to/socket``: the same over a local unix socket
+- ``memory://``: the same in-process LRU, keeping results for the full
+  ``NEUROFLOW_CACHE_TTL``, i.e. until invalidated; use it only with a single
+  worker process.
+
+Keys carry a per-user, per-scope generation counter. The write paths bump
+the generation of the scope they touched (``invalidate``), which makes
+every earlier result for that user and scope unreachable; the orphaned
+entries are left for TTL or LRU eviction. Because the counter is bumped
+only after the write commits, a result computed from pre-write data is
+always stored under the old generation.
+
+Concurrent misses for the same key are collapsed: one thread per process
+computes while the others wait, and across processes a short-lived lock
+key in the shared backend lets one worker compute while the rest poll for
+its result.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+CACHE_URL = os.getenv("NEUROFLOW_CACHE_URL", "")
+CACHE_TTL = float(os.getenv("NEUROFLOW_CACHE_TTL", "300"))
+CACHE_LOCAL_TTL = float(os.getenv("NEUROFLOW_CACHE_LOCAL_TTL", "10"))
+CACHE_MAX_ENTRIES = int(os.getenv("NEUROFLOW_CACHE_MAX_ENTRIES", "4096"))
+LOCK_TTL = 30.0  # upper bound on one computation holding the cross-worker lock
+LOCK_POLL = 0.01
+
+# Invalidation scopes: which of a user's data a cached result was computed from
+TASKS = "tasks"
+HABITS = "habits"
+
+T = TypeVar("T")
+
+class CacheError(Exception):
+    """The cache backend could not be reached or rejected a command."""
+
+class LRUBackend:
+    """In-process LRU with per-entry expiry.
+
+    Generation counters are kept apart from the entries so that LRU eviction
+    can never reset a generation and resurrect stale results.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[Tuple[float, Any]]:
+        item = self._entries.get(key)
+        if item is not None and item[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return item
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._live(key)
+            if item is None:
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Set ``key`` only if it is absent; returns whether it was set."""
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+        self.set(key, value, ttl)
+        return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+            return value
+
+class RedisBackend:
+    """Minimal Redis protocol (RESP2) client, one connection per thread.
+
+    Values are stored as JSON, so results must be JSON-encodable (datetimes
+    come back as ISO strings, which is how the API serialises them anyway).
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parsed = urlparse(url)
+        if parsed.scheme == "unix":
+            self._family, self._address = socket.AF_UNIX, parsed.path
+            query = dict(part.split("=", 1) for part in parsed.query.split("&") if "=" in part)
+            self._db = int(query.get("db", 0))
+        elif parsed.scheme == "redis":
+            self._family, self._address = socket.AF_INET, (parsed.hostname or "localhost", parsed.port or 6379)
+            self._db = int(parsed.path.lstrip("/") or 0)
+        else:
+            raise ValueError(f"Unsupported cache URL: {url}")
+        self._password = unquote(parsed.password) if parsed.password else None
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(self._family, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        sock.connect(self._address)
+        if self._family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.conn = (sock, sock.makefile("rb"))
+        if self._password:
+            self._command("AUTH", self._password)
+        if self._db:
+            self._command("SELECT", self._db)
+        return self._local.conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def _command(self, *args) -> Any:
+        try:
+            sock, reader = getattr(self._local, "conn", None) or self._connect()
+            parts = [b"*%d\r\n" % len(args)]
+            for arg in args:
+                data = arg if isinstance(arg, bytes) else str(arg).encode()
+                parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+            sock.sendall(b"".join(parts))
+            return self._read_reply(reader)
+        except OSError as exc:
+            # The connection is in an unknown state; start afresh next time
+            self._close()
+            raise CacheError(str(exc)) from exc
+
+    def _read_reply(self, reader) -> Any:
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise CacheError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            return None if length < 0 else reader.read(length + 2)[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read_reply(reader) for _ in range(length)]
+        raise CacheError(f"Unexpected reply from cache server: {line!r}")
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self._command("GET", key)
+        return None if data is None else json.loads(data)
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._command("SET", key, _dumps(value), "PX", int(ttl * 1000))
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        return self._command("SET", key, _dumps(value), "NX", "PX", int(ttl * 1000)) is not None
+
+    def delete(self, key: str):
+        self._command("DEL", key)
+
+    def counter(self, key: str) -> int:
+        return int(self._command("GET", key) or 0)
+
+    def incr(self, key: str) -> int:
+        return self._command("INCR", key)
+
+def _dumps(value: Any) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    return json.dumps(jsonable_encoder(value), separators=(",", ":")).encode()
+
+def backend_from_url(url: str):
+    """The backend for ``NEUROFLOW_CACHE_URL``, or None when caching is off."""
+    if not url:
+        return LRUBackend() if CACHE_LOCAL_TTL > 0 else None
+    if url == "memory://":
+        return LRUBackend()
+    return RedisBackend(url)
+
+class ResultCache:
+    """Per-user results with generation-based invalidation and single-flight misses."""
+
+    def __init__(self, backend: Optional[Any], ttl: float = CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _generation_key(user_id: int, scope: str) -> str:
+        return f"nf:gen:{user_id}:{scope}"
+
+    def get_or_compute(self, user_id: int, scope: str, name: str, compute: Callable[[], T]) -> T:
+        """Return the cached ``name`` result for the user, computing it on a miss.
+
+        Without a backend, or if it is unavailable, the result is computed uncached.
+        """
+        if self.backend is None:
+            return compute()
+        try:
+            generation = self.backend.counter(self._generation_key(user_id, scope))
+            key = f"nf:{user_id}:{scope}:{generation}:{name}"
+            value = self.backend.get(key)
+        except CacheError as exc:
+            logger.warning("Result cache unavailable: %s", exc)
+            return compute()
+        if value is not None:
+            return value
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        if not leader:
+            event.wait(LOCK_TTL)
+            value = self._get_quietly(key)
+            return compute() if value is None else value
+
+        try:
+            return self._compute_shared(key, compute)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def _compute_shared(self, key: str, compute: Callable[[], T]) -> T:
+        """Compute ``key`` unless another worker already is, then wait for its result."""
+        lock_key = f"{key}:lock"
+        try:
+            acquired = self.backend.add(lock_key, uuid.uuid4().hex, LOCK_TTL)
+        except CacheError:
+            return compute()
+
+        if not acquired:
+            deadline = time.monotonic() + LOCK_TTL
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL)
+                value = self._get_quietly(key)
+                if value is not None:
+                    return value
+                # The other worker gave up without storing a result
+                if self._get_quietly(lock_key) is None:
+                    break
+            return compute()
+
+        try:
+            value = compute()
+            self.backend.set(key, value, self.ttl)
+            return value
+        except CacheError as exc:
+            logger.warning("Result cache unavailable: %s", exc)
+            return value
+        finally:
+            try:
+                self.backend.delete(lock_key)
+            except CacheError:
+                pass
+
+    def _get_quietly(self, key: str) -> Optional[Any]:
+        try:
+            return self.backend.get(key)
+        except CacheError:
+            return None
+
+    def invalidate(self, user_id: int, *scopes: str):
+        """Drop the user's cached results for ``scopes`` after a committed write."""
+        if self.backend is None:
+            return
+        for scope in scopes:
+            try:
+                self.backend.incr(self._generation_key(user_id, scope))
+            except CacheError as exc:
+                logger.warning("Could not invalidate cached %s results for user %s: %s", scope, user_id, exc)
+
+result_cache = ResultCache(backend_from_url(CACHE_URL), ttl=CACHE_TTL if CACHE_URL else CACHE_LOCAL_TTL)
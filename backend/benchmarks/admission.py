@@ -0,0 +1,162 @@
+"""Load test: tail latency for well-behaved users while one client abuses the API.
+
+Starts the API with uvicorn in a scratch directory, twice: with the
+admission-control middleware disabled and enabled. Each run registers
+``--users`` well-behaved users, who make a mix of task and analytics
+requests at a steady pace, and one abusive client that hammers
+``/api/auth/token`` (bcrypt) and ``/api/analytics/streaks`` from
+``--abusive-threads`` threads. Reports the well-behaved users' latency and
+how many of the abusive requests were admitted or throttled (429), and
+exits non-zero if the well-behaved p99 with the limiter on is over budget.
+
+Run from the backend directory::
+
+    python benchmarks/admission.py --seconds 20 --budget-ms 250
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from contextlib import closing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WELL_BEHAVED_REQUESTS = [
+    ("GET", "/api/tasks/", None),
+    ("GET", "/api/analytics/overview", None),
+    ("POST", "/api/tasks/", {"title": "task", "priority": "medium"}),
+    ("GET", "/api/habits/today/", None),
+    ("GET", "/api/analytics/streaks", None),
+]
+
+def request(conn, method: str, path: str, token: str = None, body=None, form=False):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    if body is not None:
+        if form:
+            body = urllib.parse.urlencode(body)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        else:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    return response.status, response.getheader("Retry-After"), response.read()
+
+def patient_request(port: int, *args, **kwargs):
+    """A request that honours Retry-After, as a well-behaved client would."""
+    with closing(http.client.HTTPConnection("127.0.0.1", port, timeout=60)) as conn:
+        while True:
+            status, retry_after, data = request(conn, *args, **kwargs)
+            if status != 429:
+                return status, data
+            time.sleep(float(retry_after))
+
+def sign_up(port: int, username: str) -> str:
+    account = {"email": f"{username}@example.com", "username": username, "password": username}
+    patient_request(port, "POST", "/api/auth/register", body=account)
+    _, data = patient_request(port, "POST", "/api/auth/token", body={"username": username, "password": username}, form=True)
+    return json.loads(data)["access_token"]
+
+def run(limiter: bool, args) -> float:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "NEUROFLOW_RATE_LIMIT": "1" if limiter else "0"}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=env,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    patient_request(port, "GET", "/health")
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+
+            tokens = [sign_up(port, f"user{n}") for n in range(args.users)]
+            abuser_token = sign_up(port, "abuser")
+
+            stop = threading.Event()
+            latencies, statuses, abusive = [], Counter(), Counter()
+            lock = threading.Lock()
+
+            def well_behaved(token: str):
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                i = 0
+                while not stop.is_set():
+                    method, path, body = WELL_BEHAVED_REQUESTS[i % len(WELL_BEHAVED_REQUESTS)]
+                    started = time.perf_counter()
+                    status, _, _ = request(conn, method, path, token, body)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        statuses[status] += 1
+                    i += 1
+                    time.sleep(max(args.interval_ms / 1000 - elapsed, 0))
+
+            def abuse(n: int):
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                while not stop.is_set():
+                    if n % 2 == 0:
+                        status, _, _ = request(conn, "POST", "/api/auth/token", body={"username": "abuser", "password": "guess"}, form=True)
+                        route = "token"
+                    else:
+                        status, _, _ = request(conn, "GET", "/api/analytics/streaks", abuser_token)
+                        route = "streaks"
+                    with lock:
+                        abusive[(route, status)] += 1
+
+            threads = [threading.Thread(target=well_behaved, args=(token,)) for token in tokens]
+            threads += [threading.Thread(target=abuse, args=(n,)) for n in range(args.abusive_threads)]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    label = "limiter on" if limiter else "limiter off"
+    print(f"{label}: well-behaved {len(latencies)} requests   p50 {p50 * 1000:8.2f} ms   p99 {p99 * 1000:8.2f} ms   "
+          f"max {latencies[-1] * 1000:8.2f} ms   statuses {dict(statuses)}")
+    for route in ("token", "streaks"):
+        counts = {status: count for (name, status), count in sorted(abusive.items()) if name == route}
+        print(f"{'':<13}abusive {route:<8} {sum(counts.values()):6d} requests   statuses {counts}")
+    return p99
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--abusive-threads", type=int, default=16)
+    parser.add_argument("--interval-ms", type=float, default=200, help="pause between a well-behaved user's requests")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--budget-ms", type=float, default=250, help="max well-behaved p99 with the limiter on")
+    args = parser.parse_args()
+
+    run(limiter=False, args=args)
+    p99 = run(limiter=True, args=args)
+    if p99 * 1000 > args.budget_ms:
+        print(f"well-behaved p99 {p99 * 1000:.2f} ms is over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Analytics result cache benchmark: uncached vs. in-process LRU vs. shared backend.
+
+Seeds a scratch SQLite database (or ``--database-url``) with one user's
+tasks and habit entries, then for the productivity, habit and streak
+analytics reports the median latency of computing the response, of a hit
+in ``LRUBackend`` and of a hit in ``RedisBackend``. Unless ``--url``
+points at a real Redis-compatible server, the shared backend talks to a
+small in-process stand-in that implements the handful of commands the
+cache uses over a unix socket.
+
+It then simulates a stampede: ``--workers`` separate ``ResultCache``
+instances (one per simulated worker process, each with its own
+connections) fire ``--threads`` concurrent requests at a cold key and the
+number of times the analytics were actually computed is reported; it
+should be 1. Finally the user's task scope is invalidated and the next
+request must recompute.
+
+Run from the backend directory::
+
+    python benchmarks/analytics_cache.py --tasks 2000
+"""
+import argparse
+import os
+import random
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.models.database import Base, make_engine
+from app.models.models import Habit, HabitEntry, Task, User
+from app.routers.analytics import _habit_analytics, _productivity, _streaks
+from app.utils.cache import HABITS, TASKS, LRUBackend, RedisBackend, ResultCache
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """GET, SET [NX] [PX|EX], INCR, DEL, PING and SELECT over RESP2."""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.execute(args))
+
+class StandInServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 512  # as Redis' default tcp-backlog
+
+    def __init__(self, path: str):
+        super().__init__(path, StandInHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return item
+
+    def execute(self, args) -> bytes:
+        command = args[0].upper()
+        with self.lock:
+            if command == b"GET":
+                item = self._live(args[1])
+                return b"$-1\r\n" if item is None else b"$%d\r\n%s\r\n" % (len(item[0]), item[0])
+            if command == b"SET":
+                options = [arg.upper() for arg in args[3:]]
+                expires = None
+                if b"PX" in options:
+                    expires = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+                elif b"EX" in options:
+                    expires = time.monotonic() + int(options[options.index(b"EX") + 1])
+                if b"NX" in options and self._live(args[1]) is not None:
+                    return b"$-1\r\n"
+                self.data[args[1]] = (args[2], expires)
+                return b"+OK\r\n"
+            if command == b"INCR":
+                item = self._live(args[1])
+                value = int(item[0]) + 1 if item else 1
+                self.data[args[1]] = (str(value).encode(), item[1] if item else None)
+                return b":%d\r\n" % value
+            if command == b"DEL":
+                return b":%d\r\n" % sum(self.data.pop(key, None) is not None for key in args[1:])
+            if command in (b"PING", b"SELECT"):
+                return b"+OK\r\n"
+        return b"-ERR unknown command\r\n"
+
+def seed(db: Session, tasks: int, habits: int) -> int:
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.flush()
+    now = datetime.utcnow()
+    db.execute(Task.__table__.insert(), [
+        {
+            "title": f"task {i}",
+            "priority": random.choice(["low", "medium", "high"]),
+            "due_date": now - timedelta(days=i % 120),
+            "is_completed": random.random() < 0.8,
+            "completed_at": now - timedelta(days=i % 120, hours=random.randint(0, 12)),
+            "estimated_hours": 1.0,
+            "actual_hours": random.uniform(0.5, 2.0),
+            "owner_id": user.id,
+            "created_at": now - timedelta(days=i % 120 + 1),
+            "version": 1,
+        }
+        for i in range(tasks)
+    ])
+    for i in range(habits):
+        habit = Habit(name=f"habit {i}", target_frequency=7, owner_id=user.id)
+        db.add(habit)
+        db.flush()
+        db.execute(HabitEntry.__table__.insert(), [
+            {
+                "habit_id": habit.id,
+                "day": (now - timedelta(days=offset)).date(),
+                "date": now - timedelta(days=offset),
+                "completed": random.random() < 0.7,
+                "created_at": now,
+            }
+            for offset in range(90)
+        ])
+    db.commit()
+    return user.id
+
+ANALYTICS = [("productivity", TASKS, _productivity), ("habits", HABITS, _habit_analytics), ("streaks", TASKS, _streaks)]
+
+def median_ms(func, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def stampede(url: str, engine, user_id: int, workers: int, threads: int) -> int:
+    caches = [ResultCache(RedisBackend(url)) for _ in range(workers)]
+    computed = []
+    barrier = threading.Barrier(threads)
+
+    def compute():
+        computed.append(1)
+        with Session(engine) as db:
+            return _productivity(db, user_id)
+
+    def request(n: int):
+        barrier.wait()
+        caches[n % workers].get_or_compute(user_id, TASKS, "stampede", compute)
+
+    pool = [threading.Thread(target=request, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return len(computed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--habits", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--url", help="Redis-compatible server to use instead of the stand-in")
+    parser.add_argument("--database-url", help="scratch database to use instead of a temporary SQLite file; "
+                        "its NeuroFlow tables are dropped and recreated")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.database_url:
+            engine = make_engine(args.database_url)
+        else:
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            user_id = seed(db, args.tasks, args.habits)
+
+        server = None
+        url = args.url
+        if url is None:
+            path = os.path.join(workdir, "cache.sock")
+            server = StandInServer(path)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"unix://{path}"
+
+        lru, shared = ResultCache(LRUBackend()), ResultCache(RedisBackend(url))
+        print(f"{'':<14}{'uncached':>12}{'lru hit':>12}{'shared hit':>12}")
+        with Session(engine) as db:
+            for name, scope, func in ANALYTICS:
+                uncached = median_ms(lambda: func(db, user_id), max(args.runs // 10, 3))
+                lru_hit = median_ms(lambda: lru.get_or_compute(user_id, scope, name, lambda: func(db, user_id)), args.runs)
+                shared_hit = median_ms(lambda: shared.get_or_compute(user_id, scope, name, lambda: func(db, user_id)), args.runs)
+                print(f"{name:<14}{uncached:>9.2f} ms{lru_hit:>9.3f} ms{shared_hit:>9.3f} ms")
+
+        computed = stampede(url, engine, user_id, args.workers, args.threads)
+        print(f"stampede: {args.threads} concurrent misses across {args.workers} workers -> computed {computed}x")
+
+        with Session(engine) as db:
+            calls = []
+            shared.invalidate(user_id, TASKS)
+            shared.get_or_compute(user_id, TASKS, "productivity", lambda: calls.append(1) or _productivity(db, user_id))
+            print(f"after invalidate: recomputed {'yes' if calls else 'NO (stale)'}")
+
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
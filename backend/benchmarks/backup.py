@@ -0,0 +1,181 @@
+"""API latency while an online backup runs.
+
+Builds a scratch neuroflow.db padded to ``--size-mb`` with a ballast table,
+starts the API on it with uvicorn and keeps ``--clients`` clients creating
+tasks and reading today's tasks. It then measures request latency while
+idle, during a page-stepped backup (``copy_database`` with ``--step-pages``
+and ``--sleep-ms``, as the scheduled job runs it) and during a single-step
+backup of the whole file, and reports each backup's duration and restarts.
+
+Run from the backend directory (needs about three times ``--size-mb`` of
+free disk)::
+
+    python benchmarks/backup.py --size-mb 2048
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from contextlib import closing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine
+from app.models.database import Base
+from app.services.backup import copy_database
+
+def build_database(path: str, size_mb: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE ballast (id INTEGER PRIMARY KEY, data BLOB)")
+        rows_per_batch = 25_000  # ~100 MB of 4 KB blobs
+        for _ in range(max(size_mb // 100, 1)):
+            conn.execute(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+                "INSERT INTO ballast (data) SELECT randomblob(4000) FROM n", (rows_per_batch,)
+            )
+            conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, token: str = None, body=None, form=False):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    if body is not None:
+        if form:
+            body = urllib.parse.urlencode(body)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        else:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, data
+
+class Load:
+    """Clients alternating a task write and a read, recording (time, kind, latency, ok)."""
+
+    def __init__(self, port: int, token: str, clients: int):
+        self.samples = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._client, args=(port, token, n)) for n in range(clients)]
+        for thread in self._threads:
+            thread.start()
+
+    def _client(self, port: int, token: str, n: int):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        i = 0
+        while not self._stop.is_set():
+            if i % 2 == 0:
+                kind, method, path, body = "write", "POST", "/api/tasks/", {"title": f"load {n}-{i}", "priority": "medium"}
+            else:
+                kind, method, path, body = "read", "GET", "/api/tasks/today/", None
+            started = time.perf_counter()
+            try:
+                status, _ = request(conn, method, path, token, body)
+                ok = status == 200
+            except OSError:
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                ok = False
+            finished = time.perf_counter()
+            with self._lock:
+                self.samples.append((finished, kind, finished - started, ok))
+            i += 1
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def report(self, label: str, start: float, end: float):
+        with self._lock:
+            window = [sample for sample in self.samples if start <= sample[0] <= end]
+        for kind in ("write", "read"):
+            latencies = sorted(sample[2] for sample in window if sample[1] == kind)
+            errors = sum(1 for sample in window if sample[1] == kind and not sample[3])
+            if not latencies:
+                print(f"{label:<14}{kind:<6} no requests")
+                continue
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+            print(f"{label:<14}{kind:<6}{len(latencies) / (end - start):8.0f} req/s   p50 {p50 * 1000:8.2f} ms   "
+                  f"p99 {p99 * 1000:8.2f} ms   max {latencies[-1] * 1000:8.2f} ms   errors {errors}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--idle-seconds", type=float, default=5)
+    parser.add_argument("--step-pages", type=int, default=256)
+    parser.add_argument("--sleep-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, "neuroflow.db")
+        started = time.perf_counter()
+        build_database(database, args.size_mb)
+        print(f"built {os.path.getsize(database) / 1e6:.0f} MB database in {time.perf_counter() - started:.1f}s")
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            # Admission control off: the clients deliberately exceed the per-user
+            # rate, and 429s would measure rejection instead of backup impact
+            cwd=workdir, env={**os.environ, "PYTHONPATH": BACKEND_DIR, "NEUROFLOW_RATE_LIMIT": "0"},
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    with closing(http.client.HTTPConnection("127.0.0.1", port, timeout=1)) as conn:
+                        if request(conn, "GET", "/health")[0] == 200:
+                            break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+            with closing(http.client.HTTPConnection("127.0.0.1", port, timeout=30)) as conn:
+                account = {"email": "bench@example.com", "username": "bench", "password": "bench"}
+                request(conn, "POST", "/api/auth/register", body=account)
+                _, data = request(conn, "POST", "/api/auth/token", body={"username": "bench", "password": "bench"}, form=True)
+                token = json.loads(data)["access_token"]
+
+            load = Load(port, token, args.clients)
+            try:
+                time.sleep(1)  # warm up
+                idle_start = time.perf_counter()
+                time.sleep(args.idle_seconds)
+                load.report("idle", idle_start, time.perf_counter())
+
+                for label, step_pages in (("stepped", args.step_pages), ("single step", -1)):
+                    destination = os.path.join(workdir, f"backup-{step_pages}.db")
+                    backup_start = time.perf_counter()
+                    stats = copy_database(database, destination, step_pages=step_pages, step_sleep_ms=args.sleep_ms)
+                    backup_end = time.perf_counter()
+                    load.report(label, backup_start, backup_end)
+                    print(f"{'':<14}backup {backup_end - backup_start:.1f}s, {stats['steps']} steps, "
+                          f"{stats['restarts']} restarts, finished in one step: {stats['single_step']}")
+                    os.remove(destination)
+            finally:
+                load.stop()
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Write throughput benchmark: per-request commits vs. the group-commit writer.
+
+Concurrent writer threads each create tasks against a scratch SQLite
+database (or ``--database-url``), either committing on their own session
+as the routes do by default, or through ``GroupCommitWriter``. Reports
+throughput, latency percentiles and failed writes (e.g. "database is
+locked") at each level of concurrency.
+
+Run from the backend directory::
+
+    python benchmarks/group_commit.py --writers 1 10 100
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.models.database import Base, make_engine
+from app.models.models import Task, User
+from app.services.group_commit import GroupCommitWriter
+
+def create_task(user_id: int, n: int):
+    def write(session: Session):
+        task = Task(title=f"task {n}", priority="medium", owner_id=user_id)
+        session.add(task)
+        session.flush()
+        return task.id
+    return write
+
+def run(mode: str, engine, user_id: int, writers: int, writes_per_writer: int):
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    writer = GroupCommitWriter(engine) if mode == "group" else None
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(worker_id: int):
+        for i in range(writes_per_writer):
+            write = create_task(user_id, worker_id * writes_per_writer + i)
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    with session_factory() as db:
+                        write(db)
+                        db.commit()
+                else:
+                    writer.submit(write).result()
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if writer is not None:
+        writer.close()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float("nan")
+    print(f"{mode:<7} writers {writers:4d}   {len(latencies) / elapsed:9.0f} writes/s   "
+          f"p50 {statistics.median(latencies) * 1000 if latencies else float('nan'):8.2f} ms   "
+          f"p99 {p99 * 1000:8.2f} ms   errors {len(errors)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--writes", type=int, default=2000, help="total writes per run")
+    parser.add_argument("--database-url", help="scratch database to use instead of a temporary SQLite file; "
+                        "its NeuroFlow tables are dropped and recreated")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.database_url:
+            engine = make_engine(args.database_url)
+        else:
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            user = User(email="bench@example.com", username="bench", hashed_password="x")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+
+        for writers in args.writers:
+            for mode in ("direct", "group"):
+                run(mode, engine, user_id, writers, max(args.writes // writers, 1))
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Concurrency check: parallel logging of one habit-day leaves exactly one entry.
+
+``--threads`` threads, each on its own session, call ``upsert_habit_entry``
+for the same habit and day ``--upserts`` times in total against a scratch
+SQLite database (or ``--database-url``), alternating completed/not
+completed. Reports throughput and failed upserts, then exits non-zero if any
+upsert failed or the habit-day did not end with exactly one
+``habit_entries`` row whose heatmap year agrees with it.
+
+Run from the backend directory::
+
+    python benchmarks/habit_upsert.py --threads 32 --upserts 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.models.database import Base, make_engine
+from app.models.models import Habit, HabitEntry, HabitYear, User
+from app.services.habit_entries import upsert_habit_entry
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--upserts", type=int, default=200)
+    parser.add_argument("--database-url", help="scratch database to use instead of a temporary SQLite file; "
+                        "its NeuroFlow tables are dropped and recreated")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.database_url:
+            engine = make_engine(args.database_url)
+        else:
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                                   connect_args={"check_same_thread": False, "timeout": 60})
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            user = User(email="bench@example.com", username="bench", hashed_password="x")
+            db.add(user)
+            db.flush()
+            habit = Habit(name="read", owner_id=user.id)
+            db.add(habit)
+            db.commit()
+            user_id, habit_id = user.id, habit.id
+
+        logged_at = datetime.now().replace(microsecond=0)
+        errors = []
+        lock = threading.Lock()
+
+        def upsert(n: int):
+            with Session(engine) as db:
+                try:
+                    upsert_habit_entry(db, user_id, habit_id, {"date": logged_at, "completed": n % 2 == 0})
+                    db.commit()
+                except Exception as exc:
+                    db.rollback()
+                    with lock:
+                        errors.append(exc)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(upsert, range(args.upserts)))
+        elapsed = time.perf_counter() - started
+
+        with Session(engine) as db:
+            entries = db.query(HabitEntry).filter(HabitEntry.habit_id == habit_id).all()
+            year = db.query(HabitYear).filter(HabitYear.habit_id == habit_id, HabitYear.year == logged_at.year).first()
+            logged_days = sum(bin(byte).count("1") for byte in year.logged) if year is not None else 0
+        engine.dispose()
+
+    print(f"{args.upserts} upserts from {args.threads} threads in {elapsed:.2f}s "
+          f"({args.upserts / elapsed:.0f}/s), {len(errors)} failed")
+    for exc in errors[:3]:
+        print(f"  {type(exc).__name__}: {exc}")
+    print(f"habit-day rows: {len(entries)}   heatmap logged days: {logged_days}")
+    if errors or len(entries) != 1 or logged_days != 1:
+        print("FAIL: expected every upsert to succeed and exactly one entry for the habit-day")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
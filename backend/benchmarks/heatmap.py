@@ -0,0 +1,114 @@
+"""Heatmap benchmark: per-year bitsets vs. bucketing raw habit entries.
+
+Seeds a scratch SQLite database (or ``--database-url``) with one user's
+habits logged daily for a year, then compares serving that year for all
+habits from ``habit_years`` against the row-based approach (every
+``HabitEntry`` via the ORM, as ``get_habit_entries`` returns them).
+Reports median latency, peak Python memory and JSON payload size for
+each.
+
+Run from the backend directory::
+
+    python benchmarks/heatmap.py --habits 20
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.models.database import Base, make_engine
+from app.models.models import Habit, HabitEntry, User
+from app.models.schemas import HabitEntry as HabitEntrySchema
+from app.services.heatmaps import get_year_heatmap, rebuild_habit_years
+
+YEAR = 2025
+
+def seed(db: Session, habits: int) -> int:
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.flush()
+    habit_ids = []
+    for i in range(habits):
+        habit = Habit(name=f"habit {i}", target_frequency=7, owner_id=user.id)
+        db.add(habit)
+        db.flush()
+        habit_ids.append(habit.id)
+
+    start = date(YEAR, 1, 1)
+    db.execute(HabitEntry.__table__.insert(), [
+        {
+            "habit_id": habit_id,
+            "day": start + timedelta(days=offset),
+            "date": datetime.combine(start + timedelta(days=offset), datetime.min.time()),
+            "completed": random.random() < 0.7,
+            "rating": random.randint(1, 10),
+            "created_at": datetime.utcnow(),
+        }
+        for habit_id in habit_ids for offset in range(365)
+    ])
+    db.commit()
+    rebuild_habit_years(db)
+    return user.id
+
+def row_based(db: Session, user_id: int) -> str:
+    calendar = {}
+    for habit in db.query(Habit).filter(Habit.owner_id == user_id, Habit.is_active == True).all():
+        entries = db.query(HabitEntry).filter(HabitEntry.habit_id == habit.id).order_by(HabitEntry.date.desc()).all()
+        calendar[habit.id] = [HabitEntrySchema.model_validate(entry).model_dump(mode="json") for entry in entries]
+    return json.dumps(calendar)
+
+def bitset_based(db: Session, user_id: int) -> str:
+    return json.dumps(get_year_heatmap(db, user_id, YEAR))
+
+def measure(label: str, func, engine, user_id: int, runs: int):
+    timings = []
+    for _ in range(runs):
+        with Session(engine) as db:
+            started = time.perf_counter()
+            payload = func(db, user_id)
+            timings.append(time.perf_counter() - started)
+
+    with Session(engine) as db:
+        tracemalloc.start()
+        func(db, user_id)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"{label:<10} median {statistics.median(timings) * 1000:8.2f} ms   "
+          f"peak memory {peak / 1024:9.1f} KiB   payload {len(payload):9d} bytes")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--habits", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--database-url", help="scratch database to use instead of a temporary SQLite file; "
+                        "its NeuroFlow tables are dropped and recreated")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.database_url:
+            engine = make_engine(args.database_url)
+        else:
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            user_id = seed(db, args.habits)
+
+        print(f"{args.habits} habits x 365 days")
+        measure("rows", row_based, engine, user_id, args.runs)
+        measure("bitsets", bitset_based, engine, user_id, args.runs)
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
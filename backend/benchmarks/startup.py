@@ -0,0 +1,89 @@
+"""Cold-start benchmark for the API process.
+
+Prints a ``python -X importtime`` breakdown of ``import main`` grouped by
+top-level package, then starts uvicorn in a scratch directory and measures
+the time until ``/health`` first answers. Exits non-zero when that time is
+over budget.
+
+Run from the backend directory::
+
+    python benchmarks/startup.py --budget 2.0
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def importtime_breakdown(top: int):
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=workdir, env={**os.environ, "PYTHONPATH": BACKEND_DIR},
+            capture_output=True, text=True, check=True,
+        )
+
+    # Self time summed per top-level package; lines look like
+    # "import time:       self |  cumulative | <indent>module"
+    self_us = defaultdict(int)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, own, cumulative, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        self_us[name.split(".")[0]] += int(own)
+        if name == "main":
+            total_us = int(cumulative)
+
+    print(f"import main: {total_us / 1000:.1f} ms")
+    for package, us in sorted(self_us.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<24} {us / 1000:8.1f} ms")
+    return total_us / 1e6
+
+def time_to_first_health(timeout: float):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env={**os.environ, "PYTHONPATH": BACKEND_DIR},
+        )
+        try:
+            while time.perf_counter() - started < timeout:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=0.5) as response:
+                        if response.status == 200:
+                            return time.perf_counter() - started
+                except OSError:
+                    time.sleep(0.01)
+            raise TimeoutError(f"/health did not answer within {timeout}s")
+        finally:
+            server.terminate()
+            server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=2.0, help="max seconds to first /health response")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="packages to show in the import breakdown")
+    args = parser.parse_args()
+
+    importtime_breakdown(args.top)
+
+    timings = [time_to_first_health(timeout=args.budget * 5) for _ in range(args.runs)]
+    best = min(timings)
+    print(f"time to first /health: best {best:.3f}s, worst {max(timings):.3f}s (budget {args.budget:.3f}s)")
+    if best > args.budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import roadmaps, tasks, analytics, habits, auth
-from app.models.database import engine, Base
+from app.routers import roadmaps, tasks, analytics, habits, auth, sync
+from app.models.database import engine, ArchiveBase, Base
+from app.services import backup, group_commit
+from app.utils.admission import AdmissionControlMiddleware
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables when the server starts, not when main is imported
+    Base.metadata.create_all(bind=engine)
+    ArchiveBase.metadata.create_all(bind=engine)
+    backup.start()
+    yield
+    backup.shutdown()
+    group_commit.shutdown()
 
 app = FastAPI(
     title="NeuroFlow API",
     description="Your Personal AI-Driven Learning Companion",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Per-user rate limiting; added first so CORS headers also reach 429 responses
+app.add_middleware(AdmissionControlMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +33,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 # Include routers
@@ -27,6 +42,7 @@ app.include_router(roadmaps.router, prefix="/api/roadmaps", tags=["Roadmaps"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["Tasks"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(habits.router, prefix="/api/habits", tags=["Habits"])
+app.include_router(sync.router, prefix="/api/sync", tags=["Sync"])
 
 @app.get("/")
 async def root():